@@ -0,0 +1,7 @@
+"""
+ benchmarks for the analytics tools. Run from the analytics directory, e.g.
+
+   python -m benchmarks.course_tree
+
+
+"""
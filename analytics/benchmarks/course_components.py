@@ -0,0 +1,61 @@
+"""
+ memory and time taken by the course tree of a large synthetic course, and whether
+ a very deep course tree can be built, indexed and written out.
+
+   python -m benchmarks.course_components [--blocks 50000] [--depth 20000]
+
+
+"""
+import argparse
+import io
+import time
+import tracemalloc
+
+from course_events import course, trackinglog
+from . import synthetic
+
+
+def measure(documents):
+    '''
+    Return (components, bytes held by the tree, seconds to build, index and write it out)
+    '''
+    start = time.perf_counter()
+    course.CourseStructure(connection=object()).build_components(documents)
+    build = time.perf_counter() - start
+
+    # built again to measure, as tracing slows the build down
+    course.course_location.Location.cache_clear()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    components = course.CourseStructure(connection=object()).build_components(documents)
+    tree_bytes = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    index = course.CourseIndex(components)
+    indexing = time.perf_counter() - start
+
+    events = trackinglog.CourseEvents.__new__(trackinglog.CourseEvents)
+    start = time.perf_counter()
+    with io.StringIO() as outfile:
+        for component in components:
+            events._dump_course_tree(component, outfile)
+    dump = time.perf_counter() - start
+
+    return len(index.components), tree_bytes, build, indexing, dump
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='benchmark course tree memory and depth')
+    parser.add_argument('--blocks', type=int, default=50000)
+    parser.add_argument('--depth', type=int, default=20000)
+    args = parser.parse_args()
+
+    print('course\tcomponents\ttree MB\tbytes/component\tbuild s\tindex s\tdump s')
+    for name, documents in (('wide', synthetic.make_course('BenchX', 'Wide', args.blocks)),
+                            ('deep', synthetic.make_deep_course('BenchX', 'Deep', args.depth))):
+        # Locations are cached across courses, so start each from a cold cache
+        course.course_location.Location.cache_clear()
+        components, tree_bytes, build, indexing, dump = measure(documents)
+        print('%s\t%d\t%.1f\t%.0f\t%.3f\t%.3f\t%.3f' % (name, components, tree_bytes / 1e6,
+                                                      tree_bytes / components, build, indexing, dump))
@@ -0,0 +1,62 @@
+"""
+ times CourseStructure.course_components on synthetic courses of increasing size.
+ The time per block spent building the tree should stay flat as the course grows.
+
+   python -m benchmarks.course_tree [--sizes 1000 10000 20000] [--mongo mongodb://localhost]
+
+ Without --mongo the courses are loaded into mongomock, whose cursors are themselves
+ slow, so fetching the documents and building the tree are timed separately.
+
+
+"""
+import argparse
+import contextlib
+import os
+import time
+
+from course_events import course
+from . import synthetic
+
+
+def connect(mongo=None):
+    if mongo:
+        from pymongo import MongoClient
+        return MongoClient(mongo)
+
+    import mongomock
+    return mongomock.MongoClient()
+
+
+def time_course_components(client, blocks):
+    org, course_id = 'BenchX', 'B%d' % blocks
+    documents = synthetic.make_course(org, course_id, blocks)
+    synthetic.load_course(client.xmodule, documents)
+
+    structure = course.CourseStructure(client)
+    try:
+        start = time.perf_counter()
+        resultset = structure.fetch_course(org, course_id)
+        fetch = time.perf_counter() - start
+
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            start = time.perf_counter()
+            structure.build_components(resultset)
+            build = time.perf_counter() - start
+    finally:
+        client.xmodule.modulestore.delete_many({'_id.org': org, '_id.course': course_id})
+
+    return len(documents), fetch, build
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='benchmark course tree loading')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 5000, 10000, 20000])
+    parser.add_argument('--mongo', help='mongo uri to use instead of mongomock')
+    args = parser.parse_args()
+
+    client = connect(args.mongo)
+
+    print('blocks\tfetch s\tbuild s\tbuild usec/block')
+    for size in args.sizes:
+        blocks, fetch, build = time_course_components(client, size)
+        print('%d\t%.3f\t%.3f\t%.1f' % (blocks, fetch, build, build * 1e6 / blocks))
@@ -0,0 +1,120 @@
+"""
+ checks that each installed json decoder course_events.jsondecode can use decodes the
+ lines of json_fixtures.jsonl, and synthetic tracking log lines, exactly as json.loads
+ does, as bytes and as str, raising the same errors, then times them on the tracking
+ log lines. Run after upgrading orjson or simdjson.
+
+ The fixtures are tracking log lines as the LMS and Studio write them, integers too big
+ for 64 bits, NaN and Infinity, lone surrogates, bad utf-8, and lines cut short.
+
+   python -m benchmarks.json_decoders [--events 50000]
+
+
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from course_events import jsondecode
+from . import synthetic
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'json_fixtures.jsonl')
+
+
+def fixtures():
+    '''
+    Return the lines of json_fixtures.jsonl as bytes
+    '''
+    with open(FIXTURES, 'rb') as fixture_file:
+        return fixture_file.read().split(b'\n')[:-1]
+
+
+def tracking_lines(events):
+    '''
+    Return the lines of a synthetic tracking log of about events events, as bytes
+    '''
+    documents = synthetic.make_course('BenchX', 'Json', 2000)
+    handle, path = tempfile.mkstemp(suffix='.log')
+    os.close(handle)
+    try:
+        synthetic.make_tracking_log(path, documents, events)
+        with open(path, 'rb') as log_file:
+            return log_file.read().splitlines()
+    finally:
+        os.remove(path)
+
+
+def outcome(loads, data):
+    '''
+    What decoding data gives, compared by repr so that key order, int against float and
+    the sign of zero count, and NaN equals itself
+    '''
+    try:
+        value = loads(data)
+    except RecursionError:
+        return ('too deep',)
+    except Exception as e:
+        return ('error', type(e).__name__, str(e))
+    try:
+        return ('value', repr(value))
+    except RecursionError:
+        # decoded, but nested too deep to compare
+        return ('value', type(value).__name__)
+
+
+def installed():
+    '''
+    Return the names of the decoders in jsondecode.DECODERS that are installed
+    '''
+    names = []
+    for name in jsondecode.DECODERS:
+        try:
+            jsondecode.use(name)
+        except ValueError:
+            continue
+        names.append(name)
+    return names
+
+
+def mismatches(lines):
+    '''
+    Return (decoder, line) of the lines a decoder decodes otherwise than json.loads,
+    given each line as bytes and as str
+    '''
+    cases = lines + [line.decode('utf-8', 'replace') for line in lines]
+    expected = [outcome(json.loads, data) for data in cases]
+
+    found = []
+    for name in installed():
+        jsondecode.use(name)
+        for data, wanted in zip(cases, expected):
+            if outcome(jsondecode.loads, data) != wanted:
+                found.append((name, data))
+    return found
+
+
+def per_line(lines):
+    start = time.perf_counter()
+    for line in lines:
+        jsondecode.loads(line)
+    return (time.perf_counter() - start) / len(lines)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='check and benchmark the json decoders of course_events.jsondecode')
+    parser.add_argument('--events', type=int, default=50000)
+    args = parser.parse_args()
+
+    lines = tracking_lines(args.events)
+    found = mismatches(fixtures() + lines)
+    for name, data in found:
+        print('%s decodes differently from json.loads: %r' % (name, data[:100]))
+    if found:
+        raise SystemExit('%d mismatches' % len(found))
+
+    print('decoder\tus/line')
+    for name in installed():
+        jsondecode.use(name)
+        print('%s\t%.2f' % (name, per_line(lines) * 1e6))
@@ -0,0 +1,132 @@
+"""
+ times the course_events pipeline end to end on a synthetic course and tracking log:
+ CourseStructure.course_components, CourseEvents.parse and CourseEvents.dump_out each
+ separately, with events per second and the peak RSS. Results can be saved as json
+ and compared with an earlier run, e.g. from another revision.
+
+   python -m benchmarks.pipeline [--blocks 5000] [--events 1000000] [--studio-ratio 0.01]
+                                 [--workers 1] [--mongo mongodb://localhost]
+                                 [--save results.json] [--compare baseline.json]
+
+
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from course_events import course, trackinglog
+from . import synthetic
+from .course_tree import connect
+
+ORG = 'BenchX'
+
+# results compared between runs, and whether bigger is better
+METRICS = (('course_components_s', False), ('parse_s', False), ('dump_out_s', False),
+           ('events_per_s', True), ('peak_rss_mb', False))
+
+
+def peak_rss_mb():
+    '''
+    Peak resident set size so far of this process and any finished worker processes
+    '''
+    usage = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # kilobytes on linux, bytes on macOS
+    return usage / (1024.0 * 1024.0 if sys.platform == 'darwin' else 1024.0)
+
+
+def revision():
+
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=os.path.dirname(__file__),
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(client, directory, args):
+
+    course_id = 'P%d' % args.blocks
+    documents = synthetic.make_course(ORG, course_id, args.blocks)
+    synthetic.load_course(client.xmodule, documents)
+
+    log_path = os.path.join(directory, 'tracking.log' + args.compression)
+    synthetic.make_tracking_log(log_path, documents, args.events, args.studio_ratio)
+    out_path = os.path.join(directory, 'out.' + args.format)
+
+    try:
+        start = time.perf_counter()
+        course_components = course.CourseStructure(client).course_components(ORG, course_id)
+        course_components_s = time.perf_counter() - start
+
+        events = trackinglog.CourseEvents(ORG, course_id, log_path, out_path, workers=args.workers,
+                                          output_format=args.format, progress_interval=float('inf'))
+        start = time.perf_counter()
+        course_components = events.parse(course_components)
+        parse_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        events.dump_out(course_components)
+        dump_out_s = time.perf_counter() - start
+    finally:
+        client.xmodule.modulestore.delete_many({'_id.org': ORG, '_id.course': course_id})
+
+    return {'revision': revision(),
+            'python': platform.python_version(),
+            'parameters': vars(args),
+            'blocks': len(documents),
+            'log_bytes': os.path.getsize(log_path),
+            'matched': events.matcher.matched,
+            'course_components_s': course_components_s,
+            'parse_s': parse_s,
+            'dump_out_s': dump_out_s,
+            'events_per_s': args.events / parse_s if parse_s else None,
+            'peak_rss_mb': peak_rss_mb()}
+
+
+def compare(results, baseline):
+
+    print('\n%-20s %12s %12s %8s' % ('metric', 'baseline', 'this run', 'change'))
+    for metric, bigger_better in METRICS:
+        old, new = baseline.get(metric), results.get(metric)
+        if not old or new is None:
+            continue
+        change = (new - old) / old * 100.0
+        better = change > 0 if bigger_better else change < 0
+        print('%-20s %12.3f %12.3f %+7.1f%%%s' % (metric, old, new, change, '' if better or not change else ' worse'))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='benchmark the course_events pipeline on synthetic data')
+    parser.add_argument('--blocks', type=int, default=5000, help='blocks in the course')
+    parser.add_argument('--events', type=int, default=1000000, help='events in the tracking log')
+    parser.add_argument('--studio-ratio', type=float, default=0.01,
+                        help='share of the events that are Studio editing events, the rest being LMS events')
+    parser.add_argument('--compression', choices=['', '.gz', '.bz2', '.xz'], default='',
+                        help='compress the tracking log')
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--format', choices=['tsv', 'parquet'], default='tsv')
+    parser.add_argument('--mongo', help='mongo uri to use instead of mongomock')
+    parser.add_argument('--save', help='write the results to this json file')
+    parser.add_argument('--compare', help='json results of an earlier run to compare with')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        results = run(connect(args.mongo), directory, args)
+
+    for metric in ('blocks', 'log_bytes', 'matched') + tuple(metric for metric, bigger_better in METRICS):
+        print('%-20s %s' % (metric, results[metric]))
+
+    if args.save:
+        with open(args.save, 'w') as results_file:
+            json.dump(results, results_file, indent=2)
+
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            compare(results, json.load(baseline_file))
@@ -0,0 +1,251 @@
+"""
+ generators for synthetic modulestore courses and tracking logs, used by the benchmarks
+
+
+"""
+
+import datetime
+import json
+import os
+from random import Random
+
+from course_events import logreader
+
+# blocks under each vertical cycle through these categories
+LEAF_CATEGORIES = ('html', 'problem', 'video', 'discussion')
+
+
+def _location(org, course, category, name):
+    return {'tag': 'i4x', 'org': org, 'course': course, 'category': category, 'name': name, 'revision': None}
+
+
+def _url(org, course, category, name):
+    return 'i4x://%s/%s/%s/%s' % (org, course, category, name)
+
+
+def make_course(org, course, blocks, fanout=4, start='2013-09-01T00:00:00Z'):
+    '''
+    Return a list of old-mongo modulestore documents making up a course of
+    roughly `blocks` blocks: course, chapters, sequentials, verticals and leaves,
+    each with `fanout` children.
+    '''
+    documents = [{'_id': _location(org, course, 'course', course),
+                  'definition': {'children': []},
+                  'metadata': {'display_name': course, 'start': start}}]
+
+    # blocks per chapter: chapter + fanout sequentials + fanout^2 verticals + fanout^3 leaves
+    per_chapter = 1 + fanout + fanout ** 2 + fanout ** 3
+    chapters = max(1, blocks // per_chapter)
+
+    def add(category, name, children):
+        documents.append({'_id': _location(org, course, category, name),
+                          'definition': {'children': children},
+                          'metadata': {'display_name': '%s %s' % (category, name)}})
+
+    for c in range(chapters):
+        chapter = 'ch%d' % c
+        sequentials = []
+        for s in range(fanout):
+            sequential = '%s_s%d' % (chapter, s)
+            verticals = []
+            for v in range(fanout):
+                vertical = '%s_v%d' % (sequential, v)
+                leaves = []
+                for n in range(fanout):
+                    category = LEAF_CATEGORIES[n % len(LEAF_CATEGORIES)]
+                    leaf = '%s_%d' % (vertical, n)
+                    add(category, leaf, [])
+                    leaves.append(_url(org, course, category, leaf))
+                add('vertical', vertical, leaves)
+                verticals.append(_url(org, course, 'vertical', vertical))
+            add('sequential', sequential, verticals)
+            sequentials.append(_url(org, course, 'sequential', sequential))
+        add('chapter', chapter, sequentials)
+
+    return documents
+
+
+def load_course(db, documents):
+    '''
+    Insert course documents into the modulestore collection of db
+    '''
+    db.modulestore.insert_many(documents)
+
+
+def make_split_course(org, course, blocks, fanout=4, start='2013-09-01T00:00:00Z'):
+    '''
+    Return the (active_versions document, structures document) of a split modulestore
+    course with the same blocks as make_course, the course block being run `course`
+    '''
+    structure_id = '%s_%s_structure' % (org, course)
+    chapters = []
+    split_blocks = []
+    for document in make_course(org, course, blocks, fanout, start):
+        location = document['_id']
+        block_id = 'course' if location['category'] == 'course' else location['name']
+        children = [url.split('/')[-2:] for url in document['definition']['children']]
+        if location['category'] == 'chapter':
+            chapters.append(['chapter', block_id])
+        split_blocks.append({'block_type': location['category'], 'block_id': block_id,
+                             'fields': dict(document['metadata'], children=children)})
+
+    # the course block's children are its chapters
+    split_blocks[0]['fields']['children'] = chapters
+
+    active_version = {'org': org, 'course': course, 'run': course,
+                      'versions': {'published-branch': structure_id, 'draft-branch': structure_id}}
+    structure = {'_id': structure_id, 'root': ['course', 'course'], 'blocks': split_blocks}
+    return active_version, structure
+
+
+def load_split_course(db, active_version, structure):
+    '''
+    Insert a split course's documents into the modulestore collections of db
+    '''
+    db['modulestore.active_versions'].insert_one(active_version)
+    db['modulestore.structures'].insert_one(structure)
+
+
+def make_deep_course(org, course, depth, start='2013-09-01T00:00:00Z'):
+    '''
+    Return old-mongo modulestore documents for a course with one chapter holding a
+    chain of `depth` wrappers, each inside the one before
+    '''
+    documents = [{'_id': _location(org, course, 'course', course),
+                  'definition': {'children': []},
+                  'metadata': {'display_name': course, 'start': start}},
+                 {'_id': _location(org, course, 'chapter', 'ch0'),
+                  'definition': {'children': [_url(org, course, 'wrapper', 'w0')] if depth else []},
+                  'metadata': {'display_name': 'chapter ch0'}}]
+
+    for n in range(depth):
+        children = [_url(org, course, 'wrapper', 'w%d' % (n + 1))] if n + 1 < depth else []
+        documents.append({'_id': _location(org, course, 'wrapper', 'w%d' % n),
+                          'definition': {'children': children},
+                          'metadata': {'display_name': 'wrapper w%d' % n}})
+
+    return documents
+
+
+# the Studio events course_tree_events picks out, and LMS events it passes over
+STUDIO_EVENTS = ('/save_item', '/publish_draft', '/create_draft', '/delete_item', '/clone_item', '/edit/',
+                 '/create_new_course')
+LMS_EVENTS = ('page_view', 'problem_check', 'play_video', 'seq_goto', 'problem_graded')
+
+
+def _tracking_event(random, event_type, documents, org, course):
+
+    document = random.choice(documents)
+    location = document['_id']
+    url = _url(location['org'], location['course'], location['category'], location['name'])
+
+    if event_type in ('/save_item', '/publish_draft', '/create_draft', '/delete_item'):
+        return event_type, json.dumps({'POST': {'id': [url]}})
+    if event_type == '/edit/':
+        return event_type + url, '{}'
+    if event_type == '/clone_item':
+        template = 'i4x://edx/templates/%s/%s' % (location['category'],
+                                                  document['metadata']['display_name'].replace(' ', '_'))
+        return event_type, json.dumps({'POST': {'parent_location': [_url(org, course, 'vertical', 'parent')],
+                                                'template': [template],
+                                                'display_name': [document['metadata']['display_name']]}})
+    if event_type == '/create_new_course':
+        return event_type, json.dumps({'POST': {'org': [org], 'number': [course], 'display_name': [course]}})
+
+    if event_type == 'page_view':
+        return '/courses/%s/%s/courseware/%s' % (org, course, location['name']), '{"GET": {}}'
+    return event_type, json.dumps({'id': url, 'answers': {url + '_2_1': 'choice_1'}})
+
+
+def make_tracking_log(path, documents, events, studio_ratio=0.01, seed=0, start=datetime.datetime(2013, 9, 1),
+                      seconds=365 * 24 * 3600):
+    '''
+    Write a tracking log of `events` events on the blocks of a course from make_course,
+    spread in time order over `seconds` from start. studio_ratio of them are Studio
+    editing events, the rest LMS events. Logs ending .gz, .bz2 or .xz are compressed.
+    '''
+    random = Random(seed)
+    org, course = documents[0]['_id']['org'], documents[0]['_id']['course']
+    blocks = [document for document in documents if document['_id']['category'] not in ('course', 'chapter')]
+    step = datetime.timedelta(seconds=seconds / max(events, 1))
+
+    opener = logreader.OPENERS.get(os.path.splitext(path)[1], open)
+    with opener(path, 'wt') as logfile:
+        for n in range(events):
+            if random.random() < studio_ratio:
+                event_type, event = _tracking_event(random, random.choice(STUDIO_EVENTS), blocks, org, course)
+                source = 'browser'
+            else:
+                event_type, event = _tracking_event(random, random.choice(LMS_EVENTS), blocks, org, course)
+                source = 'server'
+
+            logfile.write(json.dumps({'username': 'user%d' % random.randrange(1000), 'host': 'studio.example.com',
+                                      'event_source': source, 'event_type': event_type, 'event': event,
+                                      'time': (start + step * n).isoformat() + '+00:00', 'ip': '10.0.0.1',
+                                      'agent': 'Mozilla/5.0', 'page': None}) + '\n')
+
+
+# capa response types, with the input tags they hold
+PROBLEM_RESPONSES = (
+    '<multiplechoiceresponse><choicegroup type="MultipleChoice">'
+    '<choice correct="false">{0} apples</choice><choice correct="true">{0} pears</choice>'
+    '</choicegroup></multiplechoiceresponse>',
+    '<choiceresponse><checkboxgroup direction="vertical"><choice correct="true">{0}</choice>'
+    '<choice correct="false">not {0}</choice></checkboxgroup></choiceresponse>',
+    '<stringresponse answer="{0}" type="ci"><textline size="20" label="answer {0}"/></stringresponse>',
+    '<numericalresponse answer="{0}"><responseparam type="tolerance" default="5%"/>'
+    '<formulaequationinput label="value"/></numericalresponse>',
+    '<optionresponse><optioninput options="(\'{0}\',\'other\')" correct="{0}"/></optionresponse>',
+    '<customresponse cfn="check"><script type="loncapa/python">\ndef check(expect, ans):\n'
+    '    return ans == "{0}"\n</script><textbox rows="10" cols="70" mode="python"/></customresponse>',
+    '<schematicresponse><schematic width="600" height="300" parts="g,r,s"/></schematicresponse>',
+    '<coderesponse queuename="q"><filesubmission points="25" allowed_files="{0}.py"/></coderesponse>',
+    '<imageresponse><imageinput src="/static/{0}.png" width="300" height="200" rectangle="(10,10)-(50,50)"/>'
+    '</imageresponse>',
+)
+
+
+def make_problem_xml(random, responses=3, malformed=0.0):
+    '''
+    Return the xml of a capa problem with a few responses picked at random, malformed
+    (using an html entity xml doesn't know) with probability malformed
+    '''
+    parts = ['<problem display_name="Problem %d">' % random.randrange(10000),
+             '<p>Answer the questions below about item %d.</p>' % random.randrange(1000)]
+    for n in range(responses):
+        word = 'w%d' % random.randrange(500)
+        parts.append('<p>Question %d: what is %s?</p>' % (n + 1, word))
+        parts.append(random.choice(PROBLEM_RESPONSES).format(word))
+    parts.append('<solution><div class="detailed-solution"><p>Explanation</p>'
+                 '<p>%s</p></div></solution>' % ('&nbsp;' if random.random() < malformed else 'See the notes.'))
+    parts.append('</problem>')
+    return '\n'.join(parts)
+
+
+def make_xblock_modulestore(courses, blocks, seed=0, reruns=0.0, malformed=0.01):
+    '''
+    Return old-mongo modulestore documents for `courses` courses of make_course shape with
+    about `blocks` blocks each, whose problems have xml and whose blocks carry the other
+    fields the modulestore keeps. With reruns, that share of problems reuse the xml of
+    an earlier problem, as course reruns do.
+    '''
+    random = Random(seed)
+    documents = []
+    problems = []
+    for n in range(courses):
+        org, course = 'Org%d' % (n % 7), 'Course%d' % n
+        for document in make_course(org, course, blocks):
+            document['edit_info'] = {'edited_on': datetime.datetime(2014, 1, 1) + datetime.timedelta(hours=n),
+                                     'edited_by': random.randrange(10000)}
+            document['metadata']['xml_attributes'] = {'filename': ['%s.xml' % document['_id']['name'], False]}
+            if document['_id']['category'] == 'problem':
+                if problems and random.random() < reruns:
+                    data = random.choice(problems)
+                else:
+                    data = make_problem_xml(random, random.randint(1, 4), malformed)
+                    problems.append(data)
+                document['definition']['data'] = data
+            elif document['_id']['category'] in ('html', 'video', 'discussion'):
+                document['definition']['data'] = {'data': '<p>%s</p>' % ('text ' * random.randint(20, 200))}
+            documents.append(document)
+    return documents
@@ -0,0 +1,47 @@
+"""
+ per event cost of decoding tracking log timestamps with dateutil and with
+ course_events.timestamps
+
+   python -m benchmarks.timestamps [--events 100000] [--per-second 5]
+
+
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+
+import dateutil.parser
+
+from course_events import timestamps
+
+
+def tracking_times(events, per_second):
+    '''
+    Timestamps as the LMS logs them, per_second events to each second
+    '''
+    start = datetime(2013, 9, 1)
+    step = timedelta(microseconds=1000000 // per_second + 1)
+    return [(start + step * n).isoformat() + '+00:00' for n in range(events)]
+
+
+def per_event(decode, values):
+    start = time.perf_counter()
+    for value in values:
+        decode(value)
+    return (time.perf_counter() - start) * 1e6 / len(values)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='benchmark timestamp decoding')
+    parser.add_argument('--events', type=int, default=100000)
+    parser.add_argument('--per-second', dest='per_second', type=int, default=5)
+    args = parser.parse_args()
+
+    values = tracking_times(args.events, args.per_second)
+    assert [dateutil.parser.parse(v) for v in values[:1000]] == [timestamps.parse_time(v) for v in values[:1000]]
+
+    before = per_event(dateutil.parser.parse, values)
+    after = per_event(timestamps.parse_time, values)
+    print('dateutil\t%.2f usec/event' % before)
+    print('timestamps\t%.2f usec/event' % after)
+    print('speedup\t%.1fx' % (before / after))
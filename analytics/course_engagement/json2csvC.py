@@ -1,17 +1,21 @@
 #!/usr/bin/env python
 
 from collections import deque
-import json
+import os
 from pprint import pprint
 import sys
 import six
 
+# decode json as course_events does, with orjson or simdjson if installed
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from course_events import jsondecode
+
 
 def load_nodes():
     filename = sys.argv[1]
 
     with open(filename) as f:
-        nodes = json.load(f)
+        nodes = jsondecode.loads(f.read())
 
     return add_parents_and_children(nodes)
 
@@ -1,11 +1,15 @@
 #!/usr/bin/env python
 
 import csv
-import json
+import os
 import sys
 
 from collections import defaultdict
 
+# decode json as course_events does, with orjson or simdjson if installed
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from course_events import jsondecode
+
 FIELDNAMES = ['student_id', 'module_id', 'grade', 'max_grade', 'answers']
 
 
@@ -28,7 +32,7 @@ def process_answers(inputs, answers):
 def process_row(row):
     try:
         state = row['state'].replace('\\\\', '\\')  # fix some incorrect json encodings
-        state = json.loads(state)
+        state = jsondecode.loads(state)
     except ValueError:
         state = {}
 
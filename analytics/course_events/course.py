@@ -5,10 +5,15 @@
 """
 
 from pymongo import MongoClient
-from dateutil import parser
-from . import course_location
+from . import course_location, timestamps
 
+from collections import defaultdict
 import copy
+import logging
+import os
+import pickle
+
+log = logging.getLogger(__name__)
 
 # A list of metadata that this module can inherit from its parent module
 INHERITABLE_METADATA = (
@@ -22,18 +27,144 @@ INHERITABLE_METADATA = (
     'giturl'  # for git edit link
 )
 
+# the categories of module that make up the course tree
+CATEGORIES = ('course', 'chapter', 'sequential', 'vertical',
+              'wrapper', 'problemset', 'conditional', 'randomize', 'html', 'video', 'discussion', 'problem')
+
+# bump when CourseComponent changes so older cached course trees are rebuilt
+SNAPSHOT_VERSION = 2
+
 class CourseComponent():
+    '''
+    A node of a course tree. Slots keep the memory per node down, and components without
+    children or log entries share an empty tuple until they get some
+    '''
 
-      def __init__(self, name = 'None', location=None, level=0, children = [], date = None):
+    __slots__ = ('name', 'location', 'level', 'children', 'start_date', 'log_entries')
+
+    def __init__(self, name = 'None', location=None, level=0, children = None, date = None):
         '''
         Constructor
         '''
         self.name = name
         self.location = location
         self.level = level
-        self.children = children
+        self.children = children if children else ()
         self.start_date = date
-        self.log_entries = []
+        self.log_entries = ()
+
+    def add_child(self, component):
+        if not self.children:
+            self.children = []
+        self.children.append(component)
+
+    def add_log_entry(self, log_entry):
+        if not self.log_entries:
+            self.log_entries = []
+        self.log_entries.append(log_entry)
+
+
+def walk(component):
+    '''
+    Yield a component and all those under it in tree order, without recursing so
+    however deep the tree is
+    '''
+    stack = [component]
+    while stack:
+        component = stack.pop()
+        yield component
+        if component.children:
+            stack.extend(reversed(component.children))
+
+
+def flatten(course_components):
+    '''
+    Return course trees as a list of (name, location, level, start date, position of
+    parent or None) in tree order, which pickles without recursing down the trees
+    '''
+    rows = []
+    positions = {}
+    for root in course_components:
+        parents = {id(root): None}
+        for component in walk(root):
+            positions[id(component)] = len(rows)
+            rows.append((component.name, component.location, component.level, component.start_date,
+                         parents[id(component)]))
+            for child in component.children:
+                parents[id(child)] = len(rows) - 1
+    return rows
+
+
+def unflatten(rows):
+    '''
+    Rebuild the course trees from flatten, returning (top level components, all the
+    components in tree order)
+    '''
+    roots = []
+    components = []
+    for name, location, level, start_date, parent in rows:
+        component = CourseComponent(name, location, level, None, start_date)
+        components.append(component)
+        if parent is None:
+            roots.append(component)
+        else:
+            components[parent].add_child(component)
+    return roots, components
+
+
+class CourseIndex():
+    '''
+    Lookups over a built course tree, so matching an event to its component
+    doesn't mean walking the whole tree.
+
+    Components are numbered in tree order, roots holding the positions of the top level
+    components, and both indexes map to the positions of
+    (top level component, component). Where several components share a key the first
+    one in tree order wins, as it would in a depth first search. Names are looked up
+    within a course, so one index can cover the trees of several courses.
+    '''
+
+    def __init__(self, course_components):
+        '''
+        Constructor
+        '''
+        self.components = []
+        self.roots = []
+        self.by_url = {}
+        self.by_name = {}
+
+        for root in course_components:
+            root_position = len(self.components)
+            self.roots.append(root_position)
+            for component in walk(root):
+                position = len(self.components)
+                self.components.append(component)
+                self.by_url.setdefault(component.location.url(), (root_position, position))
+                # display names default to [] when missing from the metadata
+                if isinstance(component.name, str):
+                    location = component.location
+                    self.by_name.setdefault((location.org, location.course, location.category, component.name),
+                                            (root_position, position))
+
+    def __getstate__(self):
+        # sent to worker processes, so flattened to pickle deep trees
+        state = dict(self.__dict__)
+        state['components'] = flatten(self.components[root] for root in self.roots)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.components = unflatten(self.components)[1]
+
+    def find_by_url(self, url):
+        return self.by_url.get(url, (None, None))
+
+    def find_by_name(self, course_key, category, display_name):
+        '''
+        course_key: (org, course) of the course to look in
+        '''
+        org, course = course_key
+        return self.by_name.get((org, course, category, display_name), (None, None))
 
 
 class CourseStructure():
@@ -42,46 +173,63 @@ class CourseStructure():
     '''
 
 
-    def __init__(self):
+    def __init__(self, connection=None, cache_dir=None):
         '''
         Constructor
+
+        connection: optional MongoClient (or compatible) to read the modulestore from
+        cache_dir: optional directory to keep built course trees in between runs
         '''
-        self.connection = MongoClient()
+        self.connection = connection if connection is not None else MongoClient()
+        self.cache_dir = cache_dir
         self.level = 0
         self.components = []
 
-    def _get_children(self, child, dbcursor, parent_component):
+    def _get_children(self, child, index, parent_component):
+        '''
+        Add the components at the url child, and all those under them, to parent_component.
 
+        Walks the tree with a stack of frames in place of recursion, each frame being
+        [documents at a url still to add, parent, children of the current document still
+        to add, current component, indent]. As it always has, the level goes up for every
+        url and down for every document found there.
+        '''
         self.level += 1
-        level_indent = ''
-        for result in dbcursor:
-            location = course_location.Location(result['_id'])
-
-            if location.url() == child:
+        stack = [[iter(index.get(child, ())), parent_component, None, None, '']]
+        while stack:
+            frame = stack[-1]
+            documents, parent, children, component, level_indent = frame
+
+            if children is not None:
+                next_child = next(children, None)
+                if next_child is not None:
+                    self.level += 1
+                    stack.append([iter(index.get(next_child, ())), component, None, None, ''])
+                    continue
+                self.level -= 1
+                frame[2] = None
 
-                for n in range(0, self.level):
-                    level_indent += '-'
-                print('%s [%s]: %s' % (level_indent, location.category, result.get('metadata', {}).get('display_name', [])))
-                print('%s Location %s' % (level_indent, location.url()))
-                print('')
+            found = next(documents, None)
+            if found is None:
+                stack.pop()
+                continue
+            location, result = found
 
-                children = result.get('definition', {}).get('children', [])
-                component = CourseComponent(result.get('metadata', {}).get('display_name', []), location, self.level, [])
-                parent_component.children.append(component)
-                for next_child in children:
-                    self._get_children(next_child, dbcursor.clone(), component)
+            if log.isEnabledFor(logging.DEBUG):
+                level_indent += '-' * self.level
+                frame[4] = level_indent
+                log.debug('%s [%s]: %s', level_indent, location.category, result.get('metadata', {}).get('display_name', []))
+                log.debug('%s Location %s', level_indent, location.url())
 
-                self.level -= 1
+            component = CourseComponent(result.get('metadata', {}).get('display_name', []), location, self.level)
+            parent.add_child(component)
+            frame[2] = iter(result.get('definition', {}).get('children', []))
+            frame[3] = component
 
 
-    def course_components(self, org, course_id):
+    def fetch_course(self, org, course_id):
         '''
-
-        for a course_id, course_name, org build up:
-          chapters (Section)
-          sequential (subsections)
-          vertical (unit)
-          component (component)
+        Fetch all the modulestore documents making up a course in a single query
 
         Parameters
         -----------
@@ -95,8 +243,7 @@ class CourseStructure():
 
         query = {'_id.org': org,
                      '_id.course': course_id,
-                     '_id.category': {'$in': ['course', 'chapter', 'sequential', 'vertical',
-                                              'wrapper', 'problemset', 'conditional', 'randomize', 'html', 'video', 'discussion','problem']}
+                     '_id.category': {'$in': list(CATEGORIES)}
                      }
 
         record_filter = {'_id': 1, 'definition.children': 1}
@@ -104,18 +251,33 @@ class CourseStructure():
         for attr in INHERITABLE_METADATA:
             record_filter[f'metadata.{attr}'] = 1
 
+        return list(collection.find(query, record_filter))
 
-        resultset = collection.find(query, record_filter)
+    def build_components(self, resultset):
+        '''
+        Build the course tree from the documents returned by fetch_course
 
-        chapters = list()
+        '''
 
+        # each course's tree starts from the top, even if this has built others already
+        self.level = 0
+
+        # index the documents by url so that finding a child
+        # doesn't mean rescanning the whole result set
+        results = []
+        index = defaultdict(list)
         for result in resultset:
             location = course_location.Location(result['_id'])
+            results.append((location, result))
+            index[location.url()].append((location, result))
+
+        chapters = list()
+
+        for location, result in results:
 
             if location.category == 'course':
-                print('[Course]: %s' % location.name)
-                start = parser.parse(result.get('metadata', {}).get('start', []))
-                print('Start Date: %s' % start.strftime('%m/%d/%Y %H:%M'))
+                start = timestamps.parse_time(result.get('metadata', {}).get('start', []))
+                log.info('[Course]: %s, starting %s', location.name, start.strftime('%m/%d/%Y %H:%M'))
 
                 component = CourseComponent(location.name, location, self.level, None, start)
                 self.components.append(component)
@@ -123,21 +285,100 @@ class CourseStructure():
 
             if location.category == 'chapter':
                 chapters.append(result)
-                print('[Chapter]: %s' % result.get('metadata', {}).get('display_name', []))
-                print('Location %s' % location.url())
+                log.debug('[Chapter]: %s', result.get('metadata', {}).get('display_name', []))
+                log.debug('Location %s', location.url())
 
                 children = result.get('definition', {}).get('children', [])
 
-                component = CourseComponent(result.get('metadata', {}).get('display_name', []), location, self.level, [],None)
+                component = CourseComponent(result.get('metadata', {}).get('display_name', []), location, self.level, None, None)
                 self.components.append(component)
 
                 for nextchild in children:
-                    self._get_children(nextchild, resultset.clone(), component)
+                    self._get_children(nextchild, index, component)
 
         return self.components
 
+    def all_courses(self):
+        '''
+        Return the (org, course) of every course in the modulestore
+        '''
+        collection = self.connection.xmodule.modulestore
+        courses = set()
+        for result in collection.find({'_id.category': 'course'}, {'_id': 1}):
+            courses.add((result['_id']['org'], result['_id']['course']))
+        return sorted(courses)
+
+    def course_version(self, org, course_id):
+        '''
+        Return a marker that changes whenever the course is edited: the newest
+        edit time of its documents, and how many there are to catch deletions
+        '''
+        collection = self.connection.xmodule.modulestore
+        query = {'_id.org': org, '_id.course': course_id}
+
+        newest = list(collection.find(query, {'edit_info.edited_on': 1})
+                      .sort('edit_info.edited_on', -1).limit(1))
+        edited_on = newest[0].get('edit_info', {}).get('edited_on') if newest else None
+
+        return [str(edited_on), collection.count_documents(query)]
+
+    def _snapshot_path(self, org, course_id):
+        return os.path.join(self.cache_dir, '%s__%s.pickle' % (org, course_id))
+
+    def _load_snapshot(self, org, course_id, version):
+
+        path = self._snapshot_path(org, course_id)
+        if not os.path.exists(path):
+            return None
 
+        with open(path, 'rb') as snapshot_file:
+            snapshot = pickle.load(snapshot_file)
 
+        if snapshot.get('snapshot_version') != SNAPSHOT_VERSION or snapshot.get('version') != version:
+            return None
+        return unflatten(snapshot['components'])[0]
 
+    def _save_snapshot(self, org, course_id, version, components):
 
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._snapshot_path(org, course_id)
+        snapshot = {'snapshot_version': SNAPSHOT_VERSION, 'version': version, 'components': flatten(components)}
+        with open(path + '.tmp', 'wb') as snapshot_file:
+            pickle.dump(snapshot, snapshot_file, pickle.HIGHEST_PROTOCOL)
+        os.replace(path + '.tmp', path)
 
+    def course_components(self, org, course_id, refresh=False):
+        '''
+
+        for a course_id, course_name, org build up:
+          chapters (Section)
+          sequential (subsections)
+          vertical (unit)
+          component (component)
+
+        With a cache_dir the tree is kept on disk and reused until the course is
+        edited, unless refresh is set.
+
+        Parameters
+        -----------
+        org: org name
+        course_id: id of course
+        refresh: rebuild the tree from the modulestore even if there is a cached one
+
+        '''
+
+        if self.cache_dir is None:
+            return self.build_components(self.fetch_course(org, course_id))
+
+        version = self.course_version(org, course_id)
+        if not refresh:
+            components = self._load_snapshot(org, course_id, version)
+            if components is not None:
+                log.info('Using cached course tree for %s/%s', org, course_id)
+                self.components.extend(components)
+                return self.components
+
+        start = len(self.components)
+        self.build_components(self.fetch_course(org, course_id))
+        self._save_snapshot(org, course_id, version, self.components[start:])
+        return self.components
@@ -6,6 +6,7 @@
 
 import re
 from collections import namedtuple
+from functools import lru_cache
 import six
 
 URL_RE = re.compile("""
@@ -26,6 +27,18 @@ MISSING_SLASH_URL_RE = re.compile("""
     (@(?P<revision>[^/]+))?
     """, re.VERBOSE)
 
+# A whole valid url in one pattern, for parse_many: the URL_RE and MISSING_SLASH_URL_RE
+# shapes with the INVALID_CHARS checks folded in. As with URL_RE anything after a
+# /following the revision is ignored.
+VALID_URL_RE = re.compile(r"""
+    (?P<tag>[\w.-]+):/?/
+    (?P<org>[\w.-]+)/
+    (?P<course>[\w.-]+)/
+    (?P<category>[\w.-]+)/
+    (?P<name>[\w.:-]+)
+    (?:@(?P<revision>[\w.-]+)(?=/|\Z)|@(?=/|\Z)|\Z)
+    """, re.VERBOSE)
+
 # TODO (cpennington): We should decide whether we want to expand the
 # list of valid characters in a location
 INVALID_CHARS = re.compile(r"[^\w.-]")
@@ -35,8 +48,43 @@ INVALID_CHARS_NAME = re.compile(r"[^\w.:-]")
 # html ids can contain word chars and dashes
 INVALID_HTML_CHARS = re.compile(r"[^\w-]")
 
+# Locations parsed from strings, and their urls, are kept for this many distinct
+# strings/Locations, as the same few thousand urls come up over and over in logs
+CACHE_SIZE = 16384
+
 _LocationBase = namedtuple('LocationBase', 'tag org course category name revision')
 
+# parallel lists of each part of many locations, as returned by Location.parse_many
+LocationColumns = namedtuple('LocationColumns', 'tag org course category name revision')
+
+
+def _check_list(list_):
+    def check(val, regexp):
+        if val is not None and regexp.search(val) is not None:
+            log.debug('invalid characters val="%s", list_="%s"' % (val, list_))
+            raise InvalidLocationError("Invalid characters in '%s'." % (val))
+
+    list_ = list(list_)
+    for val in list_[:4] + [list_[5]]:
+        check(val, INVALID_CHARS)
+    # names allow colons
+    check(list_[4], INVALID_CHARS_NAME)
+
+
+def _check_dict(dict_):
+    # Order matters, so flatten out into a list
+    keys = ['tag', 'org', 'course', 'category', 'name', 'revision']
+    list_ = [dict_[k] for k in keys]
+    _check_list(list_)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _url(location):
+    url = "{tag}://{org}/{course}/{category}/{name}".format(**location._asdict())
+    if location.revision:
+        url += "@" + location.revision
+    return url
+
 
 class Location(_LocationBase):
     '''
@@ -99,6 +147,36 @@ class Location(_LocationBase):
             return False
         return True
 
+    @staticmethod
+    def parse_many(values):
+        '''
+        Parse an iterable of location url strings in one pass, without building a
+        Location for each.
+
+        Returns (LocationColumns, rejects): a list of each of tag, org, course, category,
+        name and revision, with one entry per valid url in order, and a list of
+        (position, value) for the values that aren't valid location urls.
+        '''
+        tags, orgs, courses, categories, names, revisions = [], [], [], [], [], []
+        rejects = []
+        match = VALID_URL_RE.match
+
+        for position, value in enumerate(values):
+            found = match(value) if isinstance(value, str) else None
+            if found is None:
+                rejects.append((position, value))
+                continue
+
+            tag, org, course, category, name, revision = found.groups()
+            tags.append(tag)
+            orgs.append(org)
+            courses.append(course)
+            categories.append(category)
+            names.append(name)
+            revisions.append(revision)
+
+        return LocationColumns(tags, orgs, courses, categories, names, revisions), rejects
+
     @staticmethod
     def ensure_fully_specified(location):
         '''Make sure location is valid, and fully specified.  Raises
@@ -152,37 +230,8 @@ class Location(_LocationBase):
         if location is None:
             return _LocationBase.__new__(_cls, *([None] * 6))
 
-        def check_dict(dict_):
-            # Order matters, so flatten out into a list
-            keys = ['tag', 'org', 'course', 'category', 'name', 'revision']
-            list_ = [dict_[k] for k in keys]
-            check_list(list_)
-
-        def check_list(list_):
-            def check(val, regexp):
-                if val is not None and regexp.search(val) is not None:
-                    log.debug('invalid characters val="%s", list_="%s"' % (val, list_))
-                    raise InvalidLocationError("Invalid characters in '%s'." % (val))
-
-            list_ = list(list_)
-            for val in list_[:4] + [list_[5]]:
-                check(val, INVALID_CHARS)
-            # names allow colons
-            check(list_[4], INVALID_CHARS_NAME)
-
         if isinstance(location, str):
-            match = URL_RE.match(location)
-            if match is None:
-                # cdodge:
-                # check for a dropped slash near the i4x:// element of the location string. This can happen with some
-                # redirects (e.g. edx.org -> www.edx.org which I think happens in Nginx)
-                match = MISSING_SLASH_URL_RE.match(location)
-                if match is None:
-                    log.debug('location is instance of %s but no URL match' % (str,))
-                    raise InvalidLocationError(location)
-            groups = match.groupdict()
-            check_dict(groups)
-            return _LocationBase.__new__(_cls, **groups)
+            return _cls._from_string(location)
         elif isinstance(location, (list, tuple)):
             if len(location) not in (5, 6):
                 log.debug('location has wrong length')
@@ -193,27 +242,56 @@ class Location(_LocationBase):
             else:
                 args = tuple(location)
 
-            check_list(args)
+            _check_list(args)
             return _LocationBase.__new__(_cls, *args)
         elif isinstance(location, dict):
             kwargs = dict(location)
             kwargs.setdefault('revision', None)
 
-            check_dict(kwargs)
+            _check_dict(kwargs)
             return _LocationBase.__new__(_cls, **kwargs)
         elif isinstance(location, Location):
             return _LocationBase.__new__(_cls, location)
         else:
             raise InvalidLocationError(location)
 
+    @classmethod
+    @lru_cache(maxsize=CACHE_SIZE)
+    def _from_string(cls, location):
+        """
+        Parse a url into a Location. Locations are immutable so the same one
+        is handed back for a url seen recently.
+        """
+        match = URL_RE.match(location)
+        if match is None:
+            # cdodge:
+            # check for a dropped slash near the i4x:// element of the location string. This can happen with some
+            # redirects (e.g. edx.org -> www.edx.org which I think happens in Nginx)
+            match = MISSING_SLASH_URL_RE.match(location)
+            if match is None:
+                log.debug('location is instance of %s but no URL match' % (str,))
+                raise InvalidLocationError(location)
+        groups = match.groupdict()
+        _check_dict(groups)
+        return _LocationBase.__new__(cls, **groups)
+
+    @staticmethod
+    def cache_info():
+        """
+        Return the hits and misses of the parsed string and url caches
+        """
+        return {'parse': Location._from_string.cache_info(), 'url': _url.cache_info()}
+
+    @staticmethod
+    def cache_clear():
+        Location._from_string.cache_clear()
+        _url.cache_clear()
+
     def url(self):
         """
         Return a string containing the URL for this location
         """
-        url = "{tag}://{org}/{course}/{category}/{name}".format(**self.dict())
-        if self.revision:
-            url += "@" + self.revision
-        return url
+        return _url(self)
 
     def html_id(self):
         """
@@ -0,0 +1,203 @@
+"""
+ stores for the log entries found while parsing tracking logs
+
+ A log entry is (component, event, username, datetime), kept against the top level
+ component its component falls under, and read back in the order they were added.
+
+
+"""
+
+import logging
+import os
+import sqlite3
+import tempfile
+from collections import Counter, defaultdict
+from datetime import datetime
+
+from . import course
+
+log = logging.getLogger(__name__)
+
+# entries kept in memory before SQLiteEntryStore moves them to disk
+SPILL_THRESHOLD = 1000000
+
+# entries written to disk in one go once spilled, and read back in one go
+SPILL_BATCH = 10000
+
+
+class MemoryEntryStore():
+    '''
+    Keeps log entries in the log_entries list of their top level component
+    '''
+
+    def open(self, index):
+        '''
+        Start storing entries for the components of a CourseIndex
+        '''
+        self.index = index
+
+    def add(self, root, position, event_type, username, create):
+        '''
+        Store an entry for the component at position under the top level component at
+        root, positions being into the CourseIndex
+        '''
+        components = self.index.components
+        components[root].add_log_entry((components[position], event_type, username, create))
+
+    def entries(self, component):
+        '''
+        Yield the log entries kept against a component and all its children, as
+        (component, event, user, datetime)
+        '''
+        for component in course.walk(component):
+            for log_entry in component.log_entries:
+                yield log_entry
+
+    def close(self):
+        pass
+
+
+class SQLiteEntryStore(MemoryEntryStore):
+    '''
+    Keeps log entries in memory until there are more than spill_threshold of them, and
+    from then on in a SQLite database in directory, so memory use stays bounded
+    however many events there are. Datetimes are stored as iso format strings.
+    '''
+
+    def __init__(self, spill_threshold=SPILL_THRESHOLD, directory=None):
+        '''
+        Constructor
+
+        spill_threshold: number of entries to keep in memory before moving to disk
+        directory: where to put the database, by default the system temporary directory
+        '''
+        self.spill_threshold = spill_threshold
+        self.directory = directory
+        self.database = None
+        self.indexed = False
+        self.path = None
+        self.pending = defaultdict(list)
+        self.count = 0
+
+    def open(self, index):
+
+        self.index = index
+        self.roots = dict((id(index.components[root]), root) for root in index.roots)
+
+    def add(self, root, position, event_type, username, create):
+
+        self.pending[root].append((root, position, event_type, username, create))
+        self.count += 1
+
+        if self.database is not None:
+            if self.count >= SPILL_BATCH:
+                self._flush()
+        elif self.count > self.spill_threshold:
+            self._spill()
+
+    def _spill(self):
+
+        handle, self.path = tempfile.mkstemp(suffix='.sqlite', prefix='log_entries_', dir=self.directory)
+        os.close(handle)
+        log.info('More than %d log entries, keeping them in %s', self.spill_threshold, self.path)
+
+        self.database = sqlite3.connect(self.path)
+        self.database.execute('PRAGMA journal_mode = OFF')
+        self.database.execute('PRAGMA synchronous = OFF')
+        self.database.execute('CREATE TABLE entries (id INTEGER PRIMARY KEY, root INTEGER, position INTEGER, '
+                              'event TEXT, user TEXT, created TEXT)')
+        self._flush()
+
+    def _flush(self):
+
+        for rows in self.pending.values():
+            self.database.executemany('INSERT INTO entries (root, position, event, user, created) '
+                                      'VALUES (?, ?, ?, ?, ?)',
+                                      [(root, position, event_type, username, create.isoformat())
+                                       for root, position, event_type, username, create in rows])
+        self.database.commit()
+        self.pending.clear()
+        self.count = 0
+
+    def entries(self, component):
+
+        components = self.index.components
+        root = self.roots.get(id(component))
+        if root is None:
+            return
+
+        if self.database is None:
+            for root, position, event_type, username, create in self.pending[root]:
+                yield (components[position], event_type, username, create)
+            return
+
+        self._flush()
+        if not self.indexed:
+            self.database.execute('CREATE INDEX entries_root ON entries (root, id)')
+            self.indexed = True
+
+        rows = self.database.execute('SELECT position, event, user, created FROM entries '
+                                     'WHERE root = ? ORDER BY id', (root,))
+        while True:
+            batch = rows.fetchmany(SPILL_BATCH)
+            if not batch:
+                break
+            for position, event_type, username, create in batch:
+                yield (components[position], event_type, username, datetime.fromisoformat(create))
+
+    def close(self):
+
+        if self.database is not None:
+            self.database.close()
+            self.database = None
+            os.remove(self.path)
+
+
+def _summary_order(count):
+    # logs can have a null username, which can't be compared with a name
+    position, event_type, day, username = count[:4]
+    return position, event_type, day, '' if username is None else str(username)
+
+
+class AggregateEntryStore(MemoryEntryStore):
+    '''
+    Counts log entries by (component, event, day, user) rather than keeping them, so
+    memory grows with the number of distinct counts and not the number of events.
+    Days are those of the event times as logged.
+    '''
+
+    def __init__(self):
+        '''
+        Constructor
+        '''
+        self.counts = Counter()
+        self.by_root = None
+
+    def open(self, index):
+
+        self.index = index
+        self.roots = dict((id(index.components[root]), root) for root in index.roots)
+
+    def add(self, root, position, event_type, username, create):
+
+        self.counts[(root, position, event_type, create.date(), username)] += 1
+
+    def entries(self, component):
+        raise ValueError('log entries are only counted, not kept, by an AggregateEntryStore')
+
+    def summary(self, component):
+        '''
+        Yield the counts kept against a top level component, as (component, event, day,
+        user, count), in tree order of the components and then by event, day and user
+        '''
+        if self.by_root is None:
+            self.by_root = defaultdict(list)
+            for key, count in self.counts.items():
+                self.by_root[key[0]].append(key[1:] + (count,))
+            for counts in self.by_root.values():
+                counts.sort(key=_summary_order)
+
+        components = self.index.components
+        root = self.roots.get(id(component))
+        for position, event_type, day, username, count in self.by_root.get(root, []):
+            yield (components[position], event_type, day, username, count)
@@ -0,0 +1,110 @@
+"""
+ json decoding for tracking logs and other json read a line at a time
+
+ Uses orjson or simdjson when installed, as they decode several times faster than the
+ json module. Anything they won't decode, such as NaN or lone surrogates, is handed to
+ the json module, as is anything with 19 or more digits in a row, which might be an
+ integer too big for 64 bits that they'd make a float of, and anything that might be
+ nested too deep for the json module, which raises RecursionError where they needn't.
+ So the results and errors are always those of json.loads, as benchmarks/json_decoders.py
+ checks.
+
+ The decoder is picked by the ANALYTICS_JSON environment variable, one of DECODERS or
+ 'auto' for the fastest installed, or by calling use().
+
+
+"""
+
+import json
+import os
+
+ENVIRONMENT = 'ANALYTICS_JSON'
+
+# in order of preference
+DECODERS = ('orjson', 'simdjson', 'json')
+
+# json is checked for both of these in one pass, of a copy with digits made 0 and { made [
+MARKS = bytes.maketrans(b'0123456789{', b'0000000000[')
+
+# possibly an integer outside the 64 bits fast decoders keep integers in
+LONG_DIGITS = b'0' * 19
+
+# json with more [ and { than this might be nested deeper than the json module can go
+MAX_NESTING = 256
+
+# the name of the decoder in use
+name = None
+
+
+def _import(decoder):
+
+    if decoder == 'orjson':
+        import orjson
+        return orjson.loads
+    if decoder == 'simdjson':
+        import simdjson
+        return simdjson.loads
+    if decoder == 'json':
+        return None
+    raise ValueError('unknown json decoder %s, expected auto or one of %s' % (decoder, ', '.join(DECODERS)))
+
+
+def _falling_back(decode):
+
+    def loads(data):
+        if isinstance(data, str):
+            # lone surrogates are kept, for the fast decoder to turn down
+            marks = data.encode('utf-8', 'surrogatepass').translate(MARKS)
+        else:
+            marks = data.translate(MARKS)
+        if LONG_DIGITS not in marks and marks.count(b'[') <= MAX_NESTING:
+            try:
+                return decode(data)
+            except Exception:
+                pass
+        return json.loads(data)
+
+    return loads
+
+
+def loads(data):
+    '''
+    Decode a json str or bytes as json.loads would
+    '''
+    return json.loads(data)
+
+
+def use(decoder=None):
+    '''
+    Decode with decoder, 'auto' or one of DECODERS, or by default as ANALYTICS_JSON says.
+    A choice made here is also put in the environment for any worker processes started later.
+    Returns the name of the decoder used
+    '''
+    global name, loads
+
+    chosen = decoder
+    if decoder is None:
+        decoder = os.environ.get(ENVIRONMENT, 'auto')
+
+    if decoder == 'auto':
+        for candidate in DECODERS:
+            try:
+                decode = _import(candidate)
+            except ImportError:
+                continue
+            decoder = candidate
+            break
+    else:
+        try:
+            decode = _import(decoder)
+        except ImportError:
+            raise ValueError('json decoder %s is not installed' % decoder)
+
+    loads = _falling_back(decode) if decode is not None else json.loads
+    name = decoder
+    if chosen is not None:
+        os.environ[ENVIRONMENT] = chosen
+    return name
+
+
+use()
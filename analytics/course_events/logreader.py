@@ -0,0 +1,160 @@
+"""
+ finding and reading tracking logs, which may be rotated, compressed and split across files
+
+
+"""
+
+import bz2
+import glob
+import gzip
+import lzma
+import os
+import re
+
+# compressed logs are decompressed as they are read
+OPENERS = {'.gz': gzip.open, '.bz2': bz2.open, '.xz': lzma.open}
+
+GLOB_CHARS = re.compile(r'[*?[]')
+
+# a log rotated by logrotate, tracking.log.1 or tracking.log.2.gz, higher numbers being older
+ROTATED = re.compile(r'^(?P<live>.*\.log)\.(?P<number>\d+)(\.gz|\.bz2|\.xz)?$')
+
+
+def _natural_order(path):
+    # so that tracking.log-9.gz comes before tracking.log-10.gz
+    return [int(part) if part.isdigit() else part for part in re.split(r'(\d+)', path)]
+
+
+def _name_order(path):
+    '''
+    Sort key taking logs oldest first: in name order, except that logrotate's numbered
+    logs come from the highest number down, followed by the live log they were rotated
+    from, as in tracking.log.10.gz, tracking.log.2.gz, tracking.log.1, tracking.log
+    '''
+    rotated = ROTATED.match(path)
+    if rotated:
+        return _natural_order(rotated.group('live')), 0, -int(rotated.group('number'))
+    return _natural_order(path), 1, 0
+
+
+def log_paths(specs):
+    '''
+    Expand a list of log files, directories and globs into the log files to read, in order.
+    Files from a directory or glob are taken oldest first, by _name_order, and the rest
+    in the order given.
+    '''
+    if isinstance(specs, str):
+        specs = [specs]
+
+    paths = []
+    for spec in specs:
+        if os.path.isdir(spec):
+            names = [os.path.join(spec, name) for name in os.listdir(spec) if not name.startswith('.')]
+            paths.extend(sorted((name for name in names if os.path.isfile(name)), key=_name_order))
+        elif GLOB_CHARS.search(spec):
+            paths.extend(sorted(glob.glob(spec), key=_name_order))
+        else:
+            paths.append(spec)
+
+    if not paths:
+        raise IOError('no tracking logs found in %s' % ', '.join(specs))
+
+    return paths
+
+
+def open_log(path):
+    '''
+    Open a log for reading bytes, decompressing it if need be
+    '''
+    opener = OPENERS.get(os.path.splitext(path)[1], open)
+    return opener(path, 'rb')
+
+
+def path_compressed(path):
+    return os.path.splitext(path)[1] in OPENERS
+
+
+def shards(ranges, size):
+    '''
+    Split (path, start, end) byte ranges of logs into shards of about size bytes, in log
+    order. An end of None is the end of the log. Compressed logs can't be split so
+    their ranges are left whole.
+    '''
+    split = []
+    for path, start, end in ranges:
+        if path_compressed(path):
+            split.append((path, start, end))
+            continue
+
+        if end is None:
+            end = os.path.getsize(path)
+        for shard_start in range(start, max(end, start + 1), size):
+            split.append((path, shard_start, min(shard_start + size, end)))
+
+    return split
+
+
+def read_shard(path, start=0, end=None, positions=None):
+    '''
+    Yield the raw lines of a log that start in the byte range [start, end),
+    so shards split anywhere in a file still see each line exactly once.
+
+    If positions is a dict, positions[path] is set to the position reading got to.
+    '''
+    with open_log(path) as logfile:
+        position = start
+        if start > 0:
+            # resync to the first line starting at or after start
+            logfile.seek(start - 1)
+            position += len(logfile.readline()) - 1
+
+        for line in logfile:
+            if end is not None and position >= end:
+                break
+            position += len(line)
+            yield line
+
+    if positions is not None:
+        positions[path] = max(position, positions.get(path, 0))
+
+
+def read_ranges(ranges, positions=None):
+    '''
+    Yield the raw lines of each (path, start, end) range of the logs in turn
+    '''
+    for path, start, end in ranges:
+        for line in read_shard(path, start, end, positions):
+            yield line
+
+
+def read_lines(paths):
+    '''
+    Yield the raw lines of each log in turn
+    '''
+    return read_ranges((path, 0, None) for path in paths)
+
+
+def first_line(path):
+    '''
+    Return the first line of a log, or None if it doesn't have a whole one yet
+    '''
+    with open_log(path) as logfile:
+        line = logfile.readline()
+    return line if line.endswith(b'\n') else None
+
+
+def complete_length(path, size, chunk=65536):
+    '''
+    Return the length of the first size bytes of an uncompressed log up to the end
+    of its last whole line, leaving out a line that is still being written
+    '''
+    with open(path, 'rb') as logfile:
+        end = size
+        while end > 0:
+            start = max(end - chunk, 0)
+            logfile.seek(start)
+            newline = logfile.read(end - start).rfind(b'\n')
+            if newline >= 0:
+                return start + newline + 1
+            end = start
+    return 0
@@ -0,0 +1,55 @@
+"""
+ throughput reporting for parsing tracking logs
+
+
+"""
+
+import logging
+import time
+
+log = logging.getLogger(__name__)
+
+
+class ProgressReporter():
+    '''
+    Logs how parsing is going from an EventMatcher's counts: lines read per second,
+    the share of lines matched and decode errors, every interval seconds and at the
+    end of the run, with the counts of each event type at the end.
+    '''
+
+    def __init__(self, interval=30.0):
+        '''
+        Constructor
+        '''
+        self.interval = interval
+        self.started = time.perf_counter()
+        self.last_report = self.started
+
+    def _summary(self, matcher, elapsed):
+
+        rate = matcher.lines_read / elapsed if elapsed > 0 else 0.0
+        ratio = 100.0 * matcher.matched / matcher.lines_read if matcher.lines_read else 0.0
+        return ('%d lines in %.1fs (%.0f lines/s), %d matched (%.4f%%), %d decode errors' %
+                (matcher.lines_read, elapsed, rate, matcher.matched, ratio, matcher.decode_errors))
+
+    def update(self, matcher):
+        '''
+        Log progress if it's been interval seconds since the last report
+        '''
+        now = time.perf_counter()
+        if now - self.last_report >= self.interval:
+            self.last_report = now
+            log.info('read %s', self._summary(matcher, now - self.started))
+
+    def finish(self, matcher):
+        '''
+        Log the end of run summary
+        '''
+        log.info('done: %s', self._summary(matcher, time.perf_counter() - self.started))
+
+        for event_type, count in sorted(matcher.event_types.items()):
+            log.info('  %s: %d', event_type, count)
+
+        if matcher.prefilter:
+            log.info('prefilter skipped %d of %d lines, saving about %.1fs of decoding',
+                     matcher.lines_skipped, matcher.lines_read, matcher.decode_seconds_saved)
@@ -0,0 +1,136 @@
+"""
+ checkpoints so course_tree_events can pick up where the last run over a growing log left off
+
+
+"""
+
+import hashlib
+import json
+import os
+from datetime import datetime
+
+from . import logreader
+
+
+def fingerprint(path):
+    '''
+    Identify a log by a hash of its first line, so a log is still recognised after
+    it has been rotated to a new name or compressed
+    '''
+    line = logreader.first_line(path)
+    if line is None:
+        return None
+    return hashlib.sha1(line).hexdigest()
+
+
+def _course_names(courses):
+    return ', '.join('%s/%s' % (org, course) for org, course in courses)
+
+
+class Checkpoint():
+    '''
+    How far through each log a run got, and the log entries it found by then.
+
+    Saved as json: {'courses': [[org, course], ...], 'logs': {fingerprint: {path, inode, size, mtime, offset}},
+    'entries': {top level component url: [[component url, event, user, iso datetime], ...]}}.
+    Offsets into compressed logs are offsets into the decompressed log.
+    '''
+
+    def __init__(self, path, courses):
+        '''
+        Constructor
+
+        courses: the (org, course) pairs the run picks out events for
+        '''
+        self.path = path
+        self.courses = sorted([org, course] for org, course in courses)
+        self.logs = {}
+        self.entries = {}
+
+        if os.path.exists(path):
+            with open(path) as checkpoint_file:
+                saved = json.load(checkpoint_file)
+
+            # checkpoints from before several courses could be parsed at once
+            saved_courses = saved['courses'] if 'courses' in saved else [[saved['org'], saved['course']]]
+            if saved_courses != self.courses:
+                raise ValueError('checkpoint %s is for %s, not %s' %
+                                 (path, _course_names(saved_courses), _course_names(self.courses)))
+            self.logs = saved['logs']
+            self.entries = saved['entries']
+
+        self._pending = {}
+
+    def plan(self, paths):
+        '''
+        Return the (path, start, end) ranges of the logs still to be read
+        '''
+        ranges = []
+        self._pending = {}
+
+        for path in paths:
+            stat = os.stat(path)
+            log_id = fingerprint(path)
+            if log_id is None:
+                # not even one whole line yet
+                continue
+
+            done = self.logs.get(log_id)
+            start = done['offset'] if done else 0
+
+            if logreader.path_compressed(path):
+                if done and done['size'] == stat.st_size and done['mtime'] == stat.st_mtime:
+                    continue
+                end = None
+            else:
+                if stat.st_size < start:
+                    # truncated and rewritten since
+                    start = 0
+                end = logreader.complete_length(path, stat.st_size)
+                if end <= start:
+                    continue
+
+            self._pending[path] = (log_id, {'path': path, 'inode': stat.st_ino, 'size': stat.st_size,
+                                            'mtime': stat.st_mtime, 'offset': start})
+            ranges.append((path, start, end))
+
+        return ranges
+
+    def restore(self, index, store):
+        '''
+        Put back into the entry store the log entries found by earlier runs, for
+        components still in the course
+        '''
+        restored = set()
+        for root in index.roots:
+            url = index.components[root].location.url()
+            if url in restored:
+                continue
+            restored.add(url)
+
+            for entry_url, event_type, username, create in self.entries.get(url, []):
+                entry_root, position = index.find_by_url(entry_url)
+                if position is not None:
+                    store.add(root, position, event_type, username, datetime.fromisoformat(create))
+
+    def save(self, course_components, positions, store):
+        '''
+        Record the position reached in each log planned, and all the log entries so far
+
+        positions: {path: position reached}
+        '''
+        for path, (log_id, log) in self._pending.items():
+            log['offset'] = positions.get(path, log['offset'])
+            self.logs[log_id] = log
+
+        self.entries = {}
+        for component in course_components:
+            entries = [[entry.location.url(), event_type, username, create.isoformat()]
+                       for entry, event_type, username, create in store.entries(component)]
+            if entries:
+                self.entries.setdefault(component.location.url(), []).extend(entries)
+
+        saved = {'courses': self.courses, 'logs': self.logs, 'entries': self.entries}
+        with open(self.path + '.tmp', 'w') as checkpoint_file:
+            json.dump(saved, checkpoint_file)
+        os.replace(self.path + '.tmp', self.path)
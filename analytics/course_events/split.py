@@ -0,0 +1,184 @@
+"""
+ for interpreting course data from a split MongoDB modulestore
+
+ In split mongo a course's whole block structure is one document in the structures
+ collection, found through the course's entry in active_versions. It is turned into
+ the documents an old mongo modulestore would hold, with i4x locations, so the trees
+ built are the same as CourseStructure builds.
+
+
+"""
+
+import datetime
+import logging
+
+from . import course
+
+log = logging.getLogger(__name__)
+
+# the branches of a course to build the tree from, in order of preference. The draft
+# branch has the edits made in Studio that are yet to be published
+BRANCHES = ('draft-branch', 'published-branch')
+
+
+class SplitCourseStructure(course.CourseStructure):
+    '''
+    Access to a split MongoDB modulestore
+    '''
+
+    def __init__(self, connection=None, cache_dir=None, database='xmodule', branches=BRANCHES):
+        '''
+        Constructor
+
+        connection: optional MongoClient (or compatible) to read the modulestore from
+        cache_dir: optional directory to keep built course trees in between runs
+        database: name of the database the modulestore.* collections are in
+        branches: the branches to build the tree from, the first a course has is used
+        '''
+        course.CourseStructure.__init__(self, connection, cache_dir)
+        self.database = database
+        self.branches = branches
+
+    def _collection(self, name):
+        return self.connection[self.database]['modulestore.' + name]
+
+    def active_version(self, org, course_id):
+        '''
+        Return the active_versions document of a course. Where the course has several
+        runs the most recently edited one is used
+        '''
+        versions = list(self._collection('active_versions').find({'org': org, 'course': course_id})
+                        .sort('edited_on', -1).limit(1))
+        if not versions:
+            raise ValueError('no course %s/%s in the split modulestore' % (org, course_id))
+        return versions[0]
+
+    def _structure_id(self, active_version):
+
+        for branch in self.branches:
+            if branch in active_version.get('versions', {}):
+                return active_version['versions'][branch]
+        raise ValueError('course %s/%s has none of the branches %s' %
+                         (active_version['org'], active_version['course'], ', '.join(self.branches)))
+
+    def all_courses(self):
+        '''
+        Return the (org, course) of every course in the modulestore
+        '''
+        courses = set()
+        for version in self._collection('active_versions').find({}, {'org': 1, 'course': 1}):
+            courses.add((version['org'], version['course']))
+        return sorted(courses)
+
+    def course_version(self, org, course_id):
+        '''
+        Return a marker that changes whenever the course is edited: the id of the
+        structure, as every edit makes a new one
+        '''
+        active_version = self.active_version(org, course_id)
+        return [str(self._structure_id(active_version)), 'split']
+
+    def fetch_course(self, org, course_id):
+        '''
+        Fetch the structure of a course in a single query, and return its blocks as
+        old mongo modulestore documents
+
+        Parameters
+        -----------
+        org: org name
+        course_id: id of course
+
+        '''
+        active_version = self.active_version(org, course_id)
+        structure = self._collection('structures').find_one({'_id': self._structure_id(active_version)})
+        if structure is None:
+            raise ValueError('structure of course %s/%s is missing' % (org, course_id))
+
+        return structure_documents(structure, org, course_id, active_version.get('run'))
+
+
+def _blocks(structure):
+    '''
+    Return the blocks of a structure as {(block type, block id): block}, in the order
+    they are stored. Older structures keep them in a dict by block id.
+    '''
+    blocks = {}
+    stored = structure.get('blocks', [])
+    if isinstance(stored, dict):
+        for block_id, block in stored.items():
+            block_type = block.get('block_type', block.get('category'))
+            blocks[(block_type, block.get('block_id', block_id))] = block
+    else:
+        for block in stored:
+            blocks[(block['block_type'], block['block_id'])] = block
+    return blocks
+
+
+def _block_key(child, blocks_by_id):
+    '''
+    A child is stored as [block type, block id], or in older structures just the block id
+    '''
+    if isinstance(child, (list, tuple)):
+        return tuple(child)
+    if isinstance(child, dict):
+        return (child['block_type'], child['block_id'])
+    return blocks_by_id.get(child, (None, child))
+
+
+def _metadata_value(value):
+
+    # old mongo kept dates as strings
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    return value
+
+
+def structure_documents(structure, org, course_id, run=None):
+    '''
+    Return the blocks of a split structure as old mongo modulestore documents, the
+    course first and then the rest in tree order, followed by any blocks not in the tree
+
+    The course block is named after the run, as it was in old mongo
+    '''
+    blocks = _blocks(structure)
+    blocks_by_id = dict((block_id, (block_type, block_id)) for block_type, block_id in blocks)
+
+    names = {}
+    root = tuple(structure['root']) if structure.get('root') else None
+    for key in blocks:
+        names[key] = run if key == root and run else key[1]
+
+    def url(key):
+        return 'i4x://%s/%s/%s/%s' % (org, course_id, key[0], names.get(key, key[1]))
+
+    def document(key):
+        fields = blocks[key].get('fields', {})
+        metadata = {}
+        for attr in course.INHERITABLE_METADATA:
+            if attr in fields:
+                metadata[attr] = _metadata_value(fields[attr])
+
+        children = [_block_key(child, blocks_by_id) for child in fields.get('children', [])]
+        return {'_id': {'tag': 'i4x', 'org': org, 'course': course_id, 'category': key[0],
+                        'name': names[key], 'revision': None},
+                'definition': {'children': [url(child) for child in children]},
+                'metadata': metadata}, children
+
+    documents = []
+    done = set()
+    stack = [root] if root in blocks else []
+    while stack:
+        key = stack.pop()
+        if key in done or key not in blocks:
+            continue
+        done.add(key)
+        result, children = document(key)
+        documents.append(result)
+        stack.extend(reversed(children))
+
+    for key in blocks:
+        if key not in done:
+            documents.append(document(key)[0])
+
+    # as the old mongo query only fetches these
+    return [result for result in documents if result['_id']['category'] in course.CATEGORIES]
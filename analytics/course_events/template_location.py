@@ -6,6 +6,7 @@
 
 import re
 from collections import namedtuple
+from functools import lru_cache
 import six
 
 URL_RE = re.compile("""
@@ -33,9 +34,38 @@ INVALID_CHARS_NAME = re.compile(r"[^\w.:-]")
 # html ids can contain word chars and dashes
 INVALID_HTML_CHARS = re.compile(r"[^\w-]")
 
+# TemplateLocations parsed from strings, and their urls, are kept for this many
+# distinct strings/TemplateLocations
+CACHE_SIZE = 4096
+
 _LocationBase = namedtuple('LocationBase', 'tag org template category display_name')
 
 
+def _check_list(list_):
+    def check(val, regexp):
+        if val is not None and regexp.search(val) is not None:
+            log.debug('invalid characters val="%s", list_="%s"' % (val, list_))
+            raise InvalidLocationError("Invalid characters in '%s'." % (val))
+
+    list_ = list(list_)
+    for val in list_[:4] + [list_[4]]:
+        check(val, INVALID_CHARS)
+    # names allow colons
+    check(list_[4], INVALID_CHARS_NAME)
+
+
+def _check_dict(dict_):
+    # Order matters, so flatten out into a list
+    keys = ['tag', 'org', 'template', 'category', 'display_name']
+    list_ = [dict_[k] for k in keys]
+    _check_list(list_)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _url(location):
+    return "{tag}://{org}/{template}/{category}/{display_name}".format(**location._asdict())
+
+
 class TemplateLocation(_LocationBase):
     '''
     Encodes a location.
@@ -149,59 +179,61 @@ class TemplateLocation(_LocationBase):
         if location is None:
             return _LocationBase.__new__(_cls, *([None] * 5))
 
-        def check_dict(dict_):
-            # Order matters, so flatten out into a list
-            keys = ['tag', 'org', 'template', 'category', 'display_name']
-            list_ = [dict_[k] for k in keys]
-            check_list(list_)
-
-        def check_list(list_):
-            def check(val, regexp):
-                if val is not None and regexp.search(val) is not None:
-                    log.debug('invalid characters val="%s", list_="%s"' % (val, list_))
-                    raise InvalidLocationError("Invalid characters in '%s'." % (val))
-
-            list_ = list(list_)
-            for val in list_[:4] + [list_[4]]:
-                check(val, INVALID_CHARS)
-            # names allow colons
-            check(list_[4], INVALID_CHARS_NAME)
-
         if isinstance(location, str):
-            match = URL_RE.match(location)
-            if match is None:
-                # cdodge:
-                # check for a dropped slash near the i4x:// element of the location string. This can happen with some
-                # redirects (e.g. edx.org -> www.edx.org which I think happens in Nginx)
-                match = MISSING_SLASH_URL_RE.match(location)
-                if match is None:
-                    log.debug('location is instance of %s but no URL match' % (str,))
-                    raise InvalidLocationError(location)
-            groups = match.groupdict()
-            check_dict(groups)
-            return _LocationBase.__new__(_cls, **groups)
+            return _cls._from_string(location)
         elif isinstance(location, (list, tuple)):
             args = tuple(location)
 
-            check_list(args)
+            _check_list(args)
             return _LocationBase.__new__(_cls, *args)
         elif isinstance(location, dict):
             kwargs = dict(location)
             kwargs.setdefault('revision', None)
 
-            check_dict(kwargs)
+            _check_dict(kwargs)
             return _LocationBase.__new__(_cls, **kwargs)
         elif isinstance(location, Location):
             return _LocationBase.__new__(_cls, location)
         else:
             raise InvalidLocationError(location)
 
+    @classmethod
+    @lru_cache(maxsize=CACHE_SIZE)
+    def _from_string(cls, location):
+        """
+        Parse a url into a TemplateLocation. TemplateLocations are immutable so the
+        same one is handed back for a url seen recently.
+        """
+        match = URL_RE.match(location)
+        if match is None:
+            # cdodge:
+            # check for a dropped slash near the i4x:// element of the location string. This can happen with some
+            # redirects (e.g. edx.org -> www.edx.org which I think happens in Nginx)
+            match = MISSING_SLASH_URL_RE.match(location)
+            if match is None:
+                log.debug('location is instance of %s but no URL match' % (str,))
+                raise InvalidLocationError(location)
+        groups = match.groupdict()
+        _check_dict(groups)
+        return _LocationBase.__new__(cls, **groups)
+
+    @staticmethod
+    def cache_info():
+        """
+        Return the hits and misses of the parsed string and url caches
+        """
+        return {'parse': TemplateLocation._from_string.cache_info(), 'url': _url.cache_info()}
+
+    @staticmethod
+    def cache_clear():
+        TemplateLocation._from_string.cache_clear()
+        _url.cache_clear()
+
     def url(self):
         """
         Return a string containing the URL for this location
         """
-        url = "{tag}://{org}/{template}/{category}/{display_name}".format(**self.dict())
-        return url
+        return _url(self)
 
     def html_id(self):
         """
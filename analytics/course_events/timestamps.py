@@ -0,0 +1,82 @@
+"""
+ decoding of tracking log and modulestore timestamps
+
+ These come in a few fixed ISO-8601 shapes, e.g. 2013-05-01T12:34:56.123456+00:00, which
+ are decoded directly. Anything else goes to dateutil, and the results are the same.
+
+
+"""
+
+import re
+import time
+from datetime import datetime
+from dateutil import parser, tz
+
+ISO_RE = re.compile(r'''
+    (?P<second>\d{4}-\d\d-\d\d[T ]\d\d:\d\d(?::\d\d)?)
+    (?:(?<=:\d\d:\d\d)\.(?P<fraction>\d{1,6}))?
+    (?P<zone>Z|[+-]\d\d:?\d\d)?
+    \Z''', re.VERBOSE)
+
+# the decoded whole second is remembered for this many distinct seconds
+MEMO_SIZE = 100000
+
+# the tzinfo dateutil gives each zone suffix, or None where it depends on the date
+_zones = {}
+_seconds = {}
+
+
+def _zone_info(zone):
+    '''
+    Work out the tzinfo dateutil attaches for a zone suffix by letting it parse one
+    '''
+    if zone not in _zones:
+        tzinfo = parser.parse('2000-01-01T00:00:00' + zone).tzinfo
+        # tzlocal is used where the zone looks like the local one, which is only
+        # the same for every date if the local zone has no daylight saving
+        if isinstance(tzinfo, tz.tzlocal) and time.daylight:
+            tzinfo = None
+        _zones[zone] = tzinfo
+    return _zones[zone]
+
+
+def _decode_second(second, zone):
+
+    if zone is None:
+        tzinfo = None
+    else:
+        tzinfo = _zone_info(zone)
+        if tzinfo is None:
+            return parser.parse(second + zone)
+
+    return datetime(int(second[0:4]), int(second[5:7]), int(second[8:10]),
+                    int(second[11:13]), int(second[14:16]), int(second[17:19] or 0),
+                    tzinfo=tzinfo)
+
+
+def parse_time(value):
+    '''
+    Decode a timestamp, as dateutil.parser.parse would
+    '''
+    match = ISO_RE.match(value) if isinstance(value, str) else None
+    if match is None:
+        return parser.parse(value)
+
+    second, fraction, zone = match.group('second', 'fraction', 'zone')
+
+    key = (second, zone)
+    decoded = _seconds.get(key)
+    if decoded is None:
+        try:
+            decoded = _decode_second(second, zone)
+        except ValueError:
+            # out of range fields, which dateutil reports its own way
+            return parser.parse(value)
+
+        if len(_seconds) >= MEMO_SIZE:
+            _seconds.clear()
+        _seconds[key] = decoded
+
+    if fraction:
+        return decoded.replace(microsecond=int(fraction.ljust(6, '0')))
+    return decoded
@@ -5,282 +5,558 @@
 """
 
 
-import json
-from dateutil import parser
-import codecs
-from . import template_location, course_location, course
+import logging
+import multiprocessing
+import os
+import time as timer
+from collections import Counter
+from . import template_location, course_location, course, entries, jsondecode, logreader, progress, resume, \
+    timestamps, window
+
+log = logging.getLogger(__name__)
 
 EVENT_TYPE = ['/create_new_course', '/clone_item', '/save_item', '/publish_draft', '/create_draft', '/delete_item']
 
-class CourseEvents():
+# every event of interest has one of these in its raw line. Slashes are left off
+# in case they were escaped when the event was logged, and '/edit/<Location>' is
+# just 'edit'
+EVENT_TYPE_MARKERS = (b'save_item', b'publish_draft', b'create_draft', b'delete_item', b'clone_item',
+                      b'edit', b'create_new_course')
 
-    def __init__(self, org, course, logfile, outfile):
+# time decoding one in this many skipped lines to estimate the decoding saved
+DECODE_SAMPLE_RATE = 1000
 
-        self.org = org
-        self.course = course
-        self.logfile = open(logfile)
-        self.outfile = codecs.open(outfile, 'w', 'latin-1', 'replace')
+# check whether progress is due every this many lines
+PROGRESS_EVERY = 100000
 
+# size of the write buffer for the tsv output
+OUTPUT_BUFFER_SIZE = 1024 * 1024
 
-    def _dump_course_tree(self, component):
+# columns of the log entries in the output
+ENTRY_COLUMNS = ['component', 'name', 'location', 'event', 'user', 'datetime']
 
-        level_indent = ''
-        for n in range(0, component.level):
-            level_indent += '\t'
+# columns of the counts of log entries in aggregate output
+SUMMARY_COLUMNS = ['component', 'name', 'location', 'event', 'user', 'day', 'count']
 
-        out = '%s%s\t%s\t%s\n' % (level_indent, component.location.category, component.name, component.location.url())
-        self.outfile.write(out)
+# rows in each row group of parquet output
+PARQUET_BATCH = 100000
 
-        if component.children is not None and len(component.children) > 0:
-            for child_component in component.children:
-                self._dump_course_tree(child_component)
+# uncompressed logs are split into shards of about this many bytes for parallel parsing
+SHARD_SIZE = 32 * 1024 * 1024
 
-        return
 
+class EventMatcher():
+    '''
+    Picks out the course editing events for a course from the raw lines of a tracking log.
 
-    def _dump_log_children(self, component):
+    Matches are tuples of (event, root position, component position, username, datetime),
+    with positions into the CourseIndex, so they can be passed back from worker processes.
 
-        for log_entry in component.log_entries:
-            self.outfile.write(log_entry)
+    With courses, a list of (org, course), events are picked out for all of them at once,
+    each going to the course its location is in. With since and/or until only events
+    from since up to until are picked out.
+    '''
 
-        if component.children is not None and len(component.children) > 0:
-            for child_component in component.children:
-                self._dump_log_children(child_component)
+    def __init__(self, org, course, prefilter=True, courses=None, since=None, until=None):
 
-        return
+        self.org = org
+        self.course = course
+        self.courses = set(courses) if courses is not None else None
+        self.prefilter = prefilter
+        self.since = window.aware(since) if since is not None else None
+        self.until = window.aware(until) if until is not None else None
+
+        # events other than /create_new_course are only kept if their location has one of
+        # our orgs or courses, which must then appear verbatim in the line unless json escaped it
+        self.course_markers = None
+        names = [(org, course)] if courses is None else courses
+        try:
+            if all(org is not None and course is not None for org, course in names):
+                self.course_markers = tuple(set(name.encode('ascii') for pair in names for name in pair))
+        except UnicodeEncodeError:
+            pass
+
+        self.reset_counts()
+
+    def reset_counts(self):
+
+        self.lines_read = 0
+        self.lines_skipped = 0
+        self.decode_seconds_saved = 0.0
+        self.decode_errors = 0
+        self.matched = 0
+        self.event_types = Counter()
+
+    def _wanted(self, line):
+        '''
+        Cheap check on the raw line for whether it could be an event we are looking for,
+        so that most lines are never decoded
+        '''
+        for marker in EVENT_TYPE_MARKERS:
+            if marker in line:
+                break
+        else:
+            return False
+
+        if self.course_markers is None or b'create_new_course' in line:
+            return True
+
+        for marker in self.course_markers:
+            if marker in line:
+                return True
+        return False
+
+    def _course_for(self, org, course):
+        '''
+        The (org, course) an event for a location in org and course belongs to, or None
+        if it isn't for a course we are looking for
+        '''
+        if self.courses is None:
+            if org != self.org and course != self.course:
+                return None
+            return (self.org, self.course)
+
+        key = (org, course)
+        return key if key in self.courses else None
+
+    def _skip(self, line):
+
+        self.lines_skipped += 1
+        if self.lines_skipped % DECODE_SAMPLE_RATE == 0:
+            start = timer.perf_counter()
+            try:
+                jsondecode.loads(line)
+            except:
+                pass
+            self.decode_seconds_saved += (timer.perf_counter() - start) * DECODE_SAMPLE_RATE
+
+    def counts(self):
+        return (self.lines_read, self.lines_skipped, self.decode_seconds_saved, self.decode_errors,
+                self.matched, self.event_types)
+
+    def add_counts(self, counts):
+        lines_read, lines_skipped, decode_seconds_saved, decode_errors, matched, event_types = counts
+        self.lines_read += lines_read
+        self.lines_skipped += lines_skipped
+        self.decode_seconds_saved += decode_seconds_saved
+        self.decode_errors += decode_errors
+        self.matched += matched
+        self.event_types.update(event_types)
+
+    def search_components(self, username, time, event_type, location, index):
+
+        root, position = index.find_by_url(location.url())
+        if position is None:
+            return None
+
+        return (event_type, root, position, username, timestamps.parse_time(time))
+
+    def match_lines(self, lines, index, reporter=None):
+        '''
+        Yield a match for each event of interest in lines, letting the reporter know
+        how it's going now and then
+        '''
+
+        for line in lines:
+            self.lines_read += 1
+            if reporter is not None and self.lines_read % PROGRESS_EVERY == 0:
+                reporter.update(self)
+
+            if self.prefilter and not self._wanted(line):
+                self._skip(line)
+                continue
 
-    def dump_out(self, course_components):
+            try:
+                elements = jsondecode.loads(line)
+            except:
+                self.decode_errors += 1
+                continue
 
-        for component in course_components:
-            self._dump_course_tree(component)
+            match = self.match(elements, index)
+            if match is not None and self._in_window(match[4]):
+                self.matched += 1
+                yield match
 
-        out = 'component\tname\tlocation\tevent\tuser\tdatetime\n'
-        self.outfile.write(out)
+    def _in_window(self, create):
 
-        for component in course_components:
-            self._dump_log_children(component)
+        if self.since is None and self.until is None:
+            return True
+        create = window.aware(create)
+        return (self.since is None or create >= self.since) and (self.until is None or create < self.until)
 
+    def match(self, elements, index):
 
-    def _get_children(self, display_name, category, component):
+        # we are looking for particular events
+        # /create_new_course
+        # /clone_item : item is in the Templatelocation of the Event
+        # /edit/<Location>
+        # /save_item
+        # /publish_draft
+        # /create_draft
+        # /delete_item
 
+        event_type = elements['event_type']
 
-        if component.location.category == category and component.name == display_name:
-            return component
-        elif component.children is not None and len(component.children) > 0:
-            # return true if found
-            for child_component in component.children:
-                found_component = self._get_children(display_name, category, child_component)
-                if found_component is not None:
-                    return found_component
+        # if not an event of interest: continue
+        if event_type is None or (event_type not in EVENT_TYPE and event_type.find('/edit/') != 0):
+            return None
 
+        self.event_types[event_type if event_type in EVENT_TYPE else '/edit/'] += 1
 
-        return None
 
-    def _get_children_by_id(self, location_id, component):
+        # get all details
 
+        username = elements['username']
+        event = elements['event']
+        host = elements['host']
+        event_source = elements['event_source']
+        time = elements['time']
+        ip = elements['ip']
+        agent = elements['agent']
+        page = elements['page']
 
-        if component.location.url() == location_id:
-            return component
-        elif component.children is not None and len(component.children) > 0:
-            # return true if found
-            for child_component in component.children:
-                found_component = self._get_children_by_id(location_id, child_component)
-                if found_component is not None:
-                    return found_component
+        # get target
+        # Template Location items: /create_new_course, /clone_item
+        # Course Location items: /create_draft, /delete_item, /save_item, /clone_item (for parent)
 
+        if event_type == '/create_new_course':
+            post = jsondecode.loads(event)['POST']
+            org = post['org']
+            name = post['display_name']
+            number = post['number']
 
-        return None
+            key = self._course_for(org[0], number[0]) if self.courses is not None else (self.org, self.course)
+            if key is None:
+                return None
 
+            root, position = index.find_by_name(key, 'course', name[0])
+            if position is not None:
+                return ('created', root, position, username, timestamps.parse_time(time))
+        elif event_type == '/clone_item':
+            post = jsondecode.loads(event)['POST']
+            parent_locations = post['parent_location']
+            template = post['template']
 
+            parent_location = course_location.Location(parent_locations[0])
 
-    def search_components(self, username, time, event_type, location, course_components):
+            key = self._course_for(parent_location.org, parent_location.course)
+            if key is None:
+                return None
 
-        for component in course_components:
-            if component.location.url() == location.url():
-                out = '%s\t%s\t location\t%s \n' % (location.category, component.name, component.location.url())
-                print(out)
-                create = parser.parse(time)
-                out = 'user:\t%s\tevent:\t%s\t DateTime:\t%s \n' % (username, event_type, create.strftime('%m/%d/%Y %H:%M'))
-                print(out)
-                log_entry = '%s\t%s\t%s\t%s\t%s\t%s \n' % (location.category, component.name, component.location.url(),
-                        event_type,username,create.strftime('%m/%d/%Y %H:%M'))
-                component.log_entries.append(log_entry)
-
-                update_course_event(component,username,event_type,create)
+            location = template_location.TemplateLocation(template[0])
 
-                break
-            elif component.children is not None and len(component.children) > 0:
-                # return true if found
-                for child in component.children:
-                    child_component = self._get_children_by_id(location.url(), child)
-                    if child_component is not None:
-                        out = '%s\t%s\t location:\t%s \n' % (location.category, child_component.name, child_component.location.url())
-                        print(out)
-                        create = parser.parse(time)
-                        out = 'user:\t%s\tevent:\t%s\tDate Time:\t%s \n' % (username, event_type, create.strftime('%m/%d/%Y %H:%M'))
-                        print(out)
-                        log_entry = '%s\t%s\t%s\t%s\t%s\t%s \n' % (location.category, child_component.name, child_component.location.url(),
-                        event_type,username,create.strftime('%m/%d/%Y %H:%M'))
-                        component.log_entries.append(log_entry)
+            display_name = ''
+            if location.category in ['vertical', 'sequential', 'chapter']:
+                display_names = post['display_name']
+                display_name = display_names[0]
+            else:
+                display_name = location.display_name
+                # display_name may have _ substituted for spaces only in template names
+                display_name = display_name.replace('_',' ')
 
+            root, position = index.find_by_name(key, location.category, display_name)
+            if position is not None:
+                return ('clone_item', root, position, username, timestamps.parse_time(time))
+        elif event_type == '/save_item':
 
-                        break
+            # The POST may be longer than the log allows and so loses the closing braces
+            # so easier just to substring out the location id
 
-                if child_component is not None:
-                    break
+            start = event.find('i4x:')
+            end = event.find('"',start)
+            location_id = event[start:end-1]
 
+            location = course_location.Location(location_id)
 
-    def parse(self, course_components):
+            if self._course_for(location.org, location.course) is None:
+                return None
 
+            return self.search_components(username,time, 'save_item', location, index)
 
-        for line in self.logfile:
-            try:
-                elements = json.loads(line)
-            except:
-                continue
 
-            # we are looking for particular events
-            # /create_new_course
-            # /clone_item : item is in the Templatelocation of the Event
-            # /edit/<Location>
-            # /save_item
-            # /publish_draft
-            # /create_draft
-            # /delete_item
+        elif event_type == '/publish_draft' or event_type == '/create_draft':
 
-            event_type = elements['event_type']
+            post = jsondecode.loads(event)['POST']
+            location_id = post['id']
 
-            # if not an event of interest: continue
-            if event_type is None or (event_type not in EVENT_TYPE and event_type.find('/edit/') != 0):
-                continue
+            location = course_location.Location(location_id[0])
 
+            if self._course_for(location.org, location.course) is None:
+                return None
 
-            # get all details
+            return self.search_components(username,time, event_type[1:], location, index)
 
-            username = elements['username']
-            event = elements['event']
-            host = elements['host']
-            event_source = elements['event_source']
-            time = elements['time']
-            ip = elements['ip']
-            agent = elements['agent']
-            page = elements['page']
+        elif event_type.find('/edit/') != 0:
 
-            # get target
-            # Template Location items: /create_new_course, /clone_item
-            # Course Location items: /create_draft, /delete_item, /save_item, /clone_item (for parent)
+            # The POST may be longer than the log allows and so loses the closing braces
+            # so easier just to substring out the location id
 
-            if event_type == '/create_new_course':
-                post = json.loads(event)['POST']
-                org = post['org']
-                name = post['display_name']
-                number = post['number']
+            start = event.find('i4x:')
+            end = event.find('"',start)
+            location_id = event[start:end]
 
-                for component in course_components:
-                    if component.location.category == 'course' and component.name == name[0]:
-                        out = 'course:\t %s\t start_date:\t%s\t location:\t%s \n' % (name[0], component.start_date.strftime('%m/%d/%Y %H:%M'), component.location.url())
-                        print(out)
-                        create = parser.parse(time)
-                        out = 'user:\t %s \t event:\t created \t Date Time: \t %s \n' % (username, create.strftime('%m/%d/%Y %H:%M'))
-                        print(out)
-                        break
-            elif event_type == '/clone_item':
-                post = json.loads(event)['POST']
-                parent_locations = post['parent_location']
-                template = post['template']
-
-                parent_location = course_location.Location(parent_locations[0])
-
-                if parent_location.org != self.org and parent_location.course != self.course:
-                    continue
-
-                location = template_location.TemplateLocation(template[0])
-
-                display_name = ''
-                if location.category in ['vertical', 'sequential', 'chapter']:
-                    display_names = post['display_name']
-                    display_name = display_names[0]
-                else:
-                    display_name = location.display_name
-                    # display_name may have _ substituted for spaces only in template names
-                    display_name = display_name.replace('_',' ')
+            location = course_location.Location(location_id)
 
-                for component in course_components:
-                    if component.location.category == location.category and component.name == display_name:
-                        out = '%s\t%s\t location\t%s \n' % (location.category, display_name, component.location.url())
-                        print(out)
-                        create = parser.parse(time)
-                        out = 'user:\t%s\tevent:\tcreate\t Date Time\t%s \n' % (username, create.strftime('%m/%d/%Y %H:%M'))
-                        print(out)
-                        log_entry = '%s\t%s\t%s\t%s\t%s\t%s \n' % (location.category, display_name, component.location.url(),
-                        'clone_item',username,create.strftime('%m/%d/%Y %H:%M'))
-                        component.log_entries.append(log_entry)
-                        break
-                    elif component.children is not None and len(component.children) > 0:
-                        # return true if found
-                        for child in component.children:
-                            child_component = self._get_children(display_name, location.category, child)
-                            if child_component is not None:
-                                out = '%s\t%s\t location:\t%s \n' % (location.category, display_name, child_component.location.url())
-                                print(out)
-                                create = parser.parse(time)
-                                out = 'user:\t%s\tevent:\tcreate\tDate  Time:\t%s \n' % (username, create.strftime('%m/%d/%Y %H:%M'))
-                                print(out)
-                                log_entry = '%s\t%s\t%s\t%s\t%s\t%s \n' % (location.category, child_component.name, child_component.location.url(),
-                                                                        'clone_item',username,create.strftime('%m/%d/%Y %H:%M'))
-                                component.log_entries.append(log_entry)
-                                break
+            if self._course_for(location.org, location.course) is None:
+                return None
+
+            return self.search_components(username,time, 'edit', location, index)
+
+        return None
 
-                        if child_component is not None:
-                            break
-            elif event_type == '/save_item':
 
-                # The POST may be longer than the log allows and so loses the closing braces
-                # so easier just to substring out the location id
+# set up in each worker process by _init_worker
+_worker_matcher = None
+_worker_index = None
 
-                start = event.find('i4x:')
-                end = event.find('"',start)
-                location_id = event[start:end-1]
 
-                location = course_location.Location(location_id)
+def _init_worker(matcher, index):
 
-                if location.org != self.org and location.course != self.course:
-                    continue
+    global _worker_matcher, _worker_index
+    _worker_matcher = matcher
+    _worker_index = index
 
-                self.search_components(username,time, 'save_item', location, course_components)
 
+def _match_shard(shard):
+    '''
+    Match the events in one (path, start, end) shard of the logs, in a worker process
+    '''
+    positions = {}
+    _worker_matcher.reset_counts()
+    matches = list(_worker_matcher.match_lines(logreader.read_shard(*shard, positions=positions), _worker_index))
 
-            elif event_type == '/publish_draft' or event_type == '/create_draft':
+    return matches, _worker_matcher.counts(), positions
 
-                post = json.loads(event)['POST']
-                location_id = post['id']
 
-                location = course_location.Location(location_id[0])
+class CourseEvents():
 
-                if location.org != self.org and location.course != self.course:
-                    continue
+    def __init__(self, org, course, logfiles, outfile, prefilter=True, workers=1, checkpoint=None,
+                 output_format='tsv', progress_interval=30.0, courses=None, entry_store=None, aggregate=False,
+                 since=None, until=None):
+        '''
+        logfiles: a log file, directory or glob, or a list of them. Logs ending .gz, .bz2
+                  or .xz are decompressed as they are read
+        workers: number of processes to parse the logs with
+        checkpoint: file to pick up from, where an earlier run over the same logs left off,
+                    and to record where this run gets to
+        output_format: 'tsv' for the course tree followed by the log entries, or 'parquet'
+                       for just the log entries, which needs pyarrow
+        progress_interval: seconds between progress reports while parsing
+        courses: a list of (org, course) to parse the logs for in one pass, instead of org
+                 and course. outfile is then a directory, which gets a file for each course
+        entry_store: where to keep the log entries found until they are written out, by
+                     default an entries.MemoryEntryStore
+        aggregate: count the log entries for each component, event, day and user, and write
+                   out the counts instead of the entries
+
+        since, until: only pick out events from since up to until, datetimes taken as UTC
+                      if they have no zone. Only the parts of the logs around this window
+                      are read
+        '''
 
-                self.search_components(username,time, event_type[1:], location, course_components)
+        self.org = org
+        self.course = course
+        self.courses = courses
+        self.logfiles = logreader.log_paths(logfiles)
+        self.outfile = outfile
+        self.output_format = output_format
+        self.matcher = EventMatcher(org, course, prefilter, courses, since, until)
+        self.since = since
+        self.until = until
+        self.workers = workers
+        self.checkpoint = None
+        if checkpoint:
+            self.checkpoint = resume.Checkpoint(checkpoint, courses if courses is not None else [(org, course)])
+        self.progress_interval = progress_interval
+        self.aggregate = aggregate
+        if entry_store is None:
+            entry_store = entries.AggregateEntryStore() if aggregate else entries.MemoryEntryStore()
+        self.entry_store = entry_store
+
+        if aggregate and checkpoint:
+            raise ValueError('checkpoints keep every log entry, so can not be used with aggregate counts')
+        if aggregate and not isinstance(entry_store, entries.AggregateEntryStore):
+            raise ValueError('aggregate counts need an entries.AggregateEntryStore to count the log entries in')
+        if (since is not None or until is not None) and checkpoint:
+            raise ValueError('checkpoints record how far through the logs a run got, so can not be used '
+                             'with a time window')
+
+
+    def _dump_course_tree(self, component, outfile):
+
+        for component in course.walk(component):
+            level_indent = '\t' * component.level
+            out = '%s%s\t%s\t%s\n' % (level_indent, component.location.category, component.name, component.location.url())
+            outfile.write(out)
+
+
+    def _dump_tsv(self, course_components, path):
+
+        with open(path, 'w', encoding='utf-8', errors='replace', buffering=OUTPUT_BUFFER_SIZE) as outfile:
+            for component in course_components:
+                self._dump_course_tree(component, outfile)
+
+            if self.aggregate:
+                outfile.write('\t'.join(SUMMARY_COLUMNS) + '\n')
+                for component in course_components:
+                    for entry, event_type, day, username, count in self.entry_store.summary(component):
+                        outfile.write('%s\t%s\t%s\t%s\t%s\t%s\t%d\n' % (entry.location.category, entry.name,
+                                entry.location.url(), event_type, username, day.isoformat(), count))
+                return
+
+            outfile.write('\t'.join(ENTRY_COLUMNS) + '\n')
+
+            for component in course_components:
+                for entry, event_type, username, create in self.entry_store.entries(component):
+                    outfile.write('%s\t%s\t%s\t%s\t%s\t%s \n' % (entry.location.category, entry.name, entry.location.url(),
+                            event_type, username, create.strftime('%m/%d/%Y %H:%M')))
+
+    def _dump_parquet(self, course_components, path):
+
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError('parquet output needs pyarrow installed')
+
+        # written a row group at a time so the entries needn't all be in memory at once
+        schema = self._parquet_schema(pyarrow)
+        writer = pyarrow.parquet.ParquetWriter(path, schema)
+        columns = dict((column, []) for column in schema.names)
+        rows = 0
+        for row in self._rows(course_components):
+            for column, value in zip(schema.names, row):
+                columns[column].append(value)
+            rows += 1
+
+            if rows == PARQUET_BATCH:
+                writer.write_table(pyarrow.table(columns, schema=schema))
+                columns = dict((column, []) for column in schema.names)
+                rows = 0
+
+        if rows:
+            writer.write_table(pyarrow.table(columns, schema=schema))
+        writer.close()
+
+    def _parquet_schema(self, pyarrow):
+        '''
+        Return the schema of the parquet output, given rather than inferred from the first
+        rows as a column can be all nulls in them, usernames say
+        '''
+        names = SUMMARY_COLUMNS if self.aggregate else ENTRY_COLUMNS
+        types = dict((column, pyarrow.string()) for column in names)
+        if self.aggregate:
+            types['day'] = pyarrow.date32()
+            types['count'] = pyarrow.int64()
+        else:
+            types['datetime'] = pyarrow.timestamp('us', tz='UTC')
+        return pyarrow.schema([(column, types[column]) for column in names])
+
+    def _rows(self, course_components):
+        '''
+        Yield the log entries, or their counts, as rows of ENTRY_COLUMNS or SUMMARY_COLUMNS
+        '''
+        for component in course_components:
+            # as in the tsv, a missing display name comes out as []
+            if self.aggregate:
+                for entry, event_type, day, username, count in self.entry_store.summary(component):
+                    yield (entry.location.category, '%s' % (entry.name,), entry.location.url(),
+                           event_type, username, day, count)
+            else:
+                for entry, event_type, username, create in self.entry_store.entries(component):
+                    yield (entry.location.category, '%s' % (entry.name,), entry.location.url(),
+                           event_type, username, create)
+
+    def _dump(self, course_components, path):
+
+        if self.output_format == 'parquet':
+            self._dump_parquet(course_components, path)
+        else:
+            self._dump_tsv(course_components, path)
 
-            elif event_type.find('/edit/') != 0:
+    def dump_out(self, course_components):
 
-                # The POST may be longer than the log allows and so loses the closing braces
-                # so easier just to substring out the location id
+        if self.courses is None:
+            self._dump(course_components, self.outfile)
+            self.entry_store.close()
+            return
 
-                start = event.find('i4x:')
-                end = event.find('"',start)
-                location_id = event[start:end]
+        # one file for each course, named as the cached course trees are
+        by_course = dict((tuple(key), []) for key in self.courses)
+        for component in course_components:
+            key = (component.location.org, component.location.course)
+            if key in by_course:
+                by_course[key].append(component)
+
+        os.makedirs(self.outfile, exist_ok=True)
+        for (org, course_id), components in by_course.items():
+            self._dump(components, os.path.join(self.outfile, '%s__%s.%s' % (org, course_id, self.output_format)))
+        self.entry_store.close()
+
+
+    def _record(self, match, index):
+
+        event_type, root, position, username, create = match
+        component = index.components[position]
+
+        if log.isEnabledFor(logging.DEBUG):
+            if event_type == 'created':
+                log.debug('course:\t %s\t start_date:\t%s\t location:\t%s', component.name,
+                          component.start_date.strftime('%m/%d/%Y %H:%M'), component.location.url())
+            else:
+                log.debug('%s\t%s\t location:\t%s', component.location.category, component.name, component.location.url())
+            log.debug('user:\t%s\tevent:\t%s\tDate Time:\t%s', username, event_type, create.strftime('%m/%d/%Y %H:%M'))
+
+        if event_type == 'created':
+            return
+
+        # log entries are kept against the top level component the location falls under
+        self.entry_store.add(root, position, event_type, username, create)
+
+    def _parallel_matches(self, ranges, index, positions, reporter):
+        '''
+        Match events in worker processes, one shard of the logs at a time, and yield
+        the matches back in log order so the result is the same as a serial parse
+        '''
+        shards = logreader.shards(ranges, SHARD_SIZE)
+
+        with multiprocessing.Pool(self.workers, _init_worker, (self.matcher, index)) as pool:
+            for matches, counts, shard_positions in pool.imap(_match_shard, shards):
+                self.matcher.add_counts(counts)
+                reporter.update(self.matcher)
+                for path, position in shard_positions.items():
+                    positions[path] = max(position, positions.get(path, 0))
+                for match in matches:
+                    yield match
 
-                location = course_location.Location(location_id)
+    def parse(self, course_components):
 
-                if location.org != self.org and location.course != self.course:
-                    continue
+        index = course.CourseIndex(course_components)
+        self.entry_store.open(index)
 
-                self.search_components(username,time, 'edit', location, course_components)
+        if self.checkpoint:
+            ranges = self.checkpoint.plan(self.logfiles)
+            self.checkpoint.restore(index, self.entry_store)
+        else:
+            ranges = [(path, 0, None) for path in self.logfiles]
 
+        if self.since is not None or self.until is not None:
+            ranges = window.window_ranges(ranges, self.since, self.until)
 
-        return course_components
+        positions = {}
+        log.info('Decoding json with %s', jsondecode.name)
+        reporter = progress.ProgressReporter(self.progress_interval)
+        if self.workers > 1:
+            matches = self._parallel_matches(ranges, index, positions, reporter)
+        else:
+            matches = self.matcher.match_lines(logreader.read_ranges(ranges, positions), index, reporter)
 
+        for match in matches:
+            self._record(match, index)
 
+        if self.checkpoint:
+            self.checkpoint.save(course_components, positions, self.entry_store)
 
+        reporter.finish(self.matcher)
 
+        return course_components
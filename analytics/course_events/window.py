@@ -0,0 +1,191 @@
+"""
+ narrowing the tracking logs read down to the lines in a time window
+
+ Logs are written in time order, so in an uncompressed log the start and end of a window
+ are found by binary search on byte offset, peeking at the time of the line at each
+ offset. Compressed logs can't be seeked into without decompressing everything before,
+ so a sidecar index of the time every INDEX_BLOCK bytes into the decompressed log is
+ built the first time one is read, and used to skip straight to the nearest block.
+
+
+"""
+
+import json
+import logging
+import os
+from datetime import timedelta
+from dateutil import tz
+
+from . import jsondecode, logreader, timestamps
+
+log = logging.getLogger(__name__)
+
+# lines from different servers aren't quite in time order, so windows are widened by
+# this much when seeking. Events are still checked against the exact window
+SLACK = timedelta(hours=1)
+
+# bytes of decompressed log between the times kept in a compressed log's index
+INDEX_BLOCK = 16 * 1024 * 1024
+
+# bump when the layout of the index changes
+INDEX_VERSION = 1
+
+
+def aware(when):
+    '''
+    Tracking log times are UTC, so take a time without a zone to be UTC
+    '''
+    if when.tzinfo is None:
+        return when.replace(tzinfo=tz.tzutc())
+    return when
+
+
+def line_time(line):
+    '''
+    Return the time of a raw log line, or None if it hasn't one
+    '''
+    try:
+        return aware(timestamps.parse_time(jsondecode.loads(line)['time']))
+    except Exception:
+        return None
+
+
+def _timed_line(logfile, offset, end):
+    '''
+    Return (start, end, time) of the first line with a time starting at or after offset
+    and before end, or None if there isn't one
+    '''
+    logfile.seek(max(offset - 1, 0))
+    position = offset
+    if offset > 0:
+        position += len(logfile.readline()) - 1
+
+    while position < end:
+        line = logfile.readline()
+        if not line:
+            break
+        when = line_time(line)
+        if when is not None:
+            return position, position + len(line), when
+        position += len(line)
+
+    return None
+
+
+def seek_time(logfile, when, start, end):
+    '''
+    Return the offset of the first line between start and end of an uncompressed log
+    with a time of when or later, or end if there isn't one
+    '''
+    low, high = start, end
+    while low < high:
+        middle = (low + high) // 2
+        found = _timed_line(logfile, middle, high)
+        if found is None:
+            high = middle
+        elif found[2] < when:
+            low = found[1]
+        else:
+            high = found[0]
+    return low
+
+
+def _index_path(path):
+    # hidden, so it isn't taken for a log when its directory is read
+    directory, name = os.path.split(path)
+    return os.path.join(directory, '.%s.index' % name)
+
+
+def build_index(path):
+    '''
+    Return the (offset, time) of the first line with a time in each INDEX_BLOCK bytes
+    of a compressed log, reading the whole log
+    '''
+    samples = []
+    position = 0
+    next_sample = 0
+    for line in logreader.read_shard(path):
+        if position >= next_sample:
+            when = line_time(line)
+            if when is not None:
+                samples.append((position, when))
+                next_sample = (position // INDEX_BLOCK + 1) * INDEX_BLOCK
+        position += len(line)
+    return samples
+
+
+def log_index(path):
+    '''
+    Return the block index of a compressed log, building it and saving it beside the log
+    if it's missing or out of date
+    '''
+    stat = os.stat(path)
+    key = {'version': INDEX_VERSION, 'size': stat.st_size, 'mtime': stat.st_mtime, 'block': INDEX_BLOCK}
+    index_path = _index_path(path)
+
+    try:
+        with open(index_path) as index_file:
+            saved = json.load(index_file)
+        if saved['key'] == key:
+            return [(offset, aware(timestamps.parse_time(when))) for offset, when in saved['samples']]
+    except (IOError, ValueError, KeyError):
+        pass
+
+    log.info('Indexing the times in %s', path)
+    samples = build_index(path)
+    try:
+        with open(index_path + '.tmp', 'w') as index_file:
+            json.dump({'key': key, 'samples': [[offset, when.isoformat()] for offset, when in samples]},
+                      index_file)
+        os.replace(index_path + '.tmp', index_path)
+    except IOError:
+        log.warning('Could not save the index of %s, it will be rebuilt next time', path)
+
+    return samples
+
+
+def _compressed_window(path, since, until):
+
+    samples = log_index(path)
+    start, end = 0, None
+    if since is not None:
+        for offset, when in samples:
+            if when >= since:
+                break
+            start = offset
+    if until is not None:
+        for offset, when in samples:
+            if when >= until:
+                end = offset
+                break
+    return start, end
+
+
+def window_ranges(ranges, since=None, until=None):
+    '''
+    Narrow (path, start, end) ranges of logs to the lines logged from since up to until,
+    give or take SLACK, leaving out logs with nothing in the window
+    '''
+    since = aware(since) - SLACK if since is not None else None
+    until = aware(until) + SLACK if until is not None else None
+
+    narrowed = []
+    for path, start, end in ranges:
+        if logreader.path_compressed(path):
+            window_start, window_end = _compressed_window(path, since, until)
+            start = max(start, window_start)
+            if window_end is not None:
+                end = window_end if end is None else min(end, window_end)
+        else:
+            if end is None:
+                end = os.path.getsize(path)
+            with open(path, 'rb') as logfile:
+                if since is not None:
+                    start = seek_time(logfile, since, start, end)
+                if until is not None:
+                    end = seek_time(logfile, until, start, end)
+
+        if end is None or start < end:
+            narrowed.append((path, start, end))
+
+    return narrowed
@@ -6,31 +6,90 @@ __author__ = 'dglance'
 
 """
 import argparse
-
-from course_events import trackinglog,course
-
-description  = 'Prints out tsv of course structure and associated events./n'
-description += ' uses MongoDB for course structure and tracking log for events'
-
-parser = argparse.ArgumentParser(description=description)
-
-parser.add_argument('--org', dest='org', help='organisation name')
-parser.add_argument('--course', dest='course', help='course name')
-parser.add_argument('--log', dest='log', help='log path')
-parser.add_argument('--out', dest='outfile', help='tsv output file name')
-
-
-args = parser.parse_args()
-
-course_tree = course.CourseStructure()
-
-course_components = course_tree.course_components(args.org,args.course)
-
-course_events = trackinglog.CourseEvents(args.org,args.course,args.log, args.outfile)
-
-course_components = course_events.parse(course_components)
-
-course_events.dump_out(course_components)
-
-
-
+import logging
+
+from course_events import trackinglog,course,entries,jsondecode,split,timestamps
+
+
+if __name__ == '__main__':
+    description  = 'Prints out tsv of course structure and associated events./n'
+    description += ' uses MongoDB for course structure and tracking log for events'
+
+    parser = argparse.ArgumentParser(description=description)
+
+    parser.add_argument('--org', dest='org', help='organisation name')
+    parser.add_argument('--course', dest='course', help='course name')
+    parser.add_argument('--courses', dest='courses', nargs='+', metavar='ORG/COURSE',
+                        help='parse the logs once for several courses, writing a file for each into the --out directory')
+    parser.add_argument('--all-courses', dest='all_courses', action='store_true',
+                        help='as --courses, for every course in the modulestore')
+    parser.add_argument('--log', dest='log', nargs='+',
+                        help='log paths, directories or globs. .gz, .bz2 and .xz logs are decompressed as they are read')
+    parser.add_argument('--out', dest='outfile', help='tsv output file name, or directory with --courses or --all-courses')
+    parser.add_argument('--format', dest='output_format', choices=['tsv', 'parquet'], default='tsv',
+                        help='tsv of the course tree and events, or parquet of just the events (needs pyarrow)')
+    parser.add_argument('--modulestore', dest='modulestore', choices=['mongo', 'split'], default='mongo',
+                        help='read course structure from an old mongo or a split mongo modulestore')
+    parser.add_argument('--aggregate', dest='aggregate', action='store_true',
+                        help='write counts of events per component, event, day and user instead of every event')
+    parser.add_argument('--since', dest='since', type=timestamps.parse_time,
+                        help='only events from this time (UTC unless given a zone), e.g. 2014-03-01')
+    parser.add_argument('--until', dest='until', type=timestamps.parse_time, help='only events before this time')
+    parser.add_argument('--cache-dir', dest='cache_dir', help='directory to keep course trees in between runs')
+    parser.add_argument('--refresh', dest='refresh', action='store_true',
+                        help='rebuild the course tree from MongoDB even if there is a cached one')
+    parser.add_argument('--checkpoint', dest='checkpoint',
+                        help='file recording how far through the logs this run got, so the next run only reads new lines')
+    parser.add_argument('--spill-threshold', dest='spill_threshold', type=int,
+                        help='keep the log entries found in a SQLite file once there are more than this many')
+    parser.add_argument('--spill-dir', dest='spill_dir', help='directory for the SQLite file, by default the temp directory')
+    parser.add_argument('--json-decoder', dest='json_decoder', choices=('auto',) + jsondecode.DECODERS,
+                        help='json decoder for the logs, by default $%s or the fastest installed' % jsondecode.ENVIRONMENT)
+    parser.add_argument('--workers', dest='workers', type=int, default=1, help='number of processes to parse the logs with')
+    parser.add_argument('--progress-interval', dest='progress_interval', type=float, default=30.0,
+                        help='seconds between progress reports while parsing the logs')
+    parser.add_argument('-v', '--verbose', dest='verbose', action='store_true',
+                        help='also log the course tree and every matched event')
+    parser.add_argument('-q', '--quiet', dest='quiet', action='store_true', help='only log warnings and errors')
+
+
+    args = parser.parse_args()
+    if args.aggregate and (args.spill_threshold is not None or args.spill_dir):
+        parser.error('--aggregate keeps counts rather than log entries, so has nothing to spill to disk')
+
+    level = logging.DEBUG if args.verbose else logging.WARNING if args.quiet else logging.INFO
+    logging.basicConfig(level=level, format='%(asctime)s %(levelname)s %(message)s')
+
+    if args.json_decoder:
+        jsondecode.use(args.json_decoder)
+
+    if args.modulestore == 'split':
+        course_tree = split.SplitCourseStructure(cache_dir=args.cache_dir)
+    else:
+        course_tree = course.CourseStructure(cache_dir=args.cache_dir)
+
+    courses = None
+    if args.all_courses:
+        courses = course_tree.all_courses()
+    elif args.courses:
+        courses = [tuple(name.split('/', 1)) for name in args.courses]
+
+    if courses is None:
+        course_components = course_tree.course_components(args.org,args.course, refresh=args.refresh)
+    else:
+        for org, course_id in courses:
+            course_components = course_tree.course_components(org, course_id, refresh=args.refresh)
+
+    entry_store = None
+    if args.spill_threshold is not None:
+        entry_store = entries.SQLiteEntryStore(args.spill_threshold, args.spill_dir)
+
+    course_events = trackinglog.CourseEvents(args.org,args.course,args.log, args.outfile, workers=args.workers,
+                                             checkpoint=args.checkpoint, output_format=args.output_format,
+                                             progress_interval=args.progress_interval, courses=courses,
+                                             entry_store=entry_store, aggregate=args.aggregate,
+                                             since=args.since, until=args.until)
+
+    course_components = course_events.parse(course_components)
+
+    course_events.dump_out(course_components)
@@ -1,46 +1,169 @@
 #!/usr/bin/env python
 
 from pymongo import MongoClient
-from xml.etree.cElementTree import fromstring, ParseError
 from collections import defaultdict
 import csv
+import json
+import multiprocessing
 import sys
 import six
 
-def is_input(tag):
-    return tag.endswith(('input', 'group')) or tag in ('textline', 'textbox', 'filesubmission', 'schematic', 'crystallography')
+from xblock_inputs import problem_data, count_problem, count_chunk, Memo, CourseStore
+
+# problems are sent to worker processes this many at a time
+CHUNK_SIZE = 200
+
+# all that is needed of a problem when the other categories are counted in mongo
+PROBLEM_FIELDS = {'_id': 1, 'definition.data': 1}
+
+
+def course_markers(db):
+    '''
+    Return {course_id: marker} of every course, the marker changing whenever a module of
+    the course is edited, added or deleted: the newest edit time of its modules, and how
+    many there are
+    '''
+    pipeline = [
+        {'$match': {'_id.category': {'$exists': True}}},
+        {'$group': {'_id': {'org': '$_id.org', 'course': '$_id.course'},
+                    'edited_on': {'$max': '$edit_info.edited_on'}, 'count': {'$sum': 1}}},
+    ]
+    markers = {}
+    for group in db.modulestore.aggregate(pipeline, allowDiskUse=True):
+        course_id = '{org}/{course}'.format(**group['_id'])
+        markers[course_id] = json.dumps([str(group['edited_on']), group['count']])
+    return markers
+
+
+def course_query(course_ids):
+    '''
+    Return a query for the modules of the courses with course_ids
+    '''
+    # old mongo org and course names can't have a / in them
+    return {'$or': [dict(zip(('_id.org', '_id.course'), course_id.split('/'))) for course_id in course_ids]}
+
+
+def count_categories(db, courses, query=None):
+    '''
+    Count the modules other than problems in each course with an aggregation in mongo,
+    so that they needn't be fetched
+    '''
+    pipeline = [
+        {'$match': dict(query or {}, **{'_id.category': {'$exists': True, '$ne': 'problem'}})},
+        {'$group': {'_id': {'org': '$_id.org', 'course': '$_id.course', 'category': '$_id.category'},
+                    'count': {'$sum': 1}}},
+    ]
+    for group in db.modulestore.aggregate(pipeline, allowDiskUse=True):
+        course_id = '{org}/{course}'.format(**group['_id'])
+        courses[course_id][group['_id']['category']] += group['count']
+
+
+def problem_chunks(problems, categories, memo=None):
+    '''
+    Yield the problems among documents in lists of CHUNK_SIZE (problem, memo key, found),
+    as count_chunk takes them, counting the other modules into categories as they go by
+    '''
+    chunk = []
+    for p in problems:
+        if not isinstance(p['_id'], dict):
+            continue
 
-def find_problems(db):
-    problems = db.modulestore.find()
-    problem_types = {}
-    courses = defaultdict(lambda: defaultdict(int))
+        category = p['_id']['category']
+
+        if category == 'problem':
+            key = found = None
+            if memo is not None:
+                data = problem_data(p)
+                if data is not None:
+                    key = memo.key(data)
+                    found = memo.get(key)
+            chunk.append((p, key, found))
+            if len(chunk) == CHUNK_SIZE:
+                yield chunk
+                chunk = []
+        else:
+            categories['{org}/{course}'.format(**p['_id'])][category] += 1
+
+    if chunk:
+        yield chunk
+
+
+def count_parallel(problems, courses, errors, workers, memo=None):
+    '''
+    Count the problems in worker processes, merging what they count into courses and
+    their errors into errors in the order of the problems
+    '''
+    # counted apart from courses, as the pool takes chunks from another thread
+    categories = defaultdict(lambda: defaultdict(int))
+
+    with multiprocessing.Pool(workers) as pool:
+        for counts, chunk_errors, parsed in pool.imap(count_chunk, problem_chunks(problems, categories, memo)):
+            for key, problem_counts, error, seconds in parsed:
+                memo.put(key, problem_counts, error, seconds)
+            for course_id, course_counts in counts.items():
+                for key, count in course_counts.items():
+                    courses[course_id][key] += count
+            errors.extend(chunk_errors)
+
+    for course_id, course_counts in categories.items():
+        for category, count in course_counts.items():
+            courses[course_id][category] += count
+
+
+def count_courses(db, courses, errors, query=None, aggregate=False, workers=1, memo=None):
+    '''
+    Count the modules matching query, or all of them, into courses, and the errors of
+    problems that can't be parsed into errors as (course_id, message)
+    '''
+    if aggregate:
+        count_categories(db, courses, query)
+        problems = db.modulestore.find(dict(query or {}, **{'_id.category': 'problem'}), PROBLEM_FIELDS)
+    else:
+        problems = db.modulestore.find(query or {})
+
+    if workers > 1:
+        count_parallel(problems, courses, errors, workers, memo)
+        problems = []
 
     for p in problems:
         if not isinstance(p['_id'], dict):
             continue
 
-        course_id = '{org}/{course}'.format(**p['_id'])
-
         category = p['_id']['category']
 
         if category == 'problem':
-            data = p['definition']['data']
-            if not isinstance(data, str):
-                if 'data' not in data:
-                    continue
-                data = data['data']
-
-            try:
-                tree = fromstring(data.encode('utf8'))
-            except ParseError as e:
-                sys.stderr.write('ERROR: cannot parse "{}": {}\n'.format(str(p), str(e)))
-                continue
-
-            for elt in tree.getiterator():
-                if is_input(elt.tag):
-                    courses[course_id]['capa.' + elt.tag] += 1
+            error = count_problem(p, courses, memo)
+            if error:
+                errors.append(('{org}/{course}'.format(**p['_id']), error))
         else:
-            courses[course_id][category] += 1
+            courses['{org}/{course}'.format(**p['_id'])][category] += 1
+
+
+def find_problems(db, aggregate=False, workers=1, memo=None, store=None):
+    '''
+    aggregate: count the modules other than problems in mongo and only fetch the
+               problems, and only the parts of them needed
+    workers: number of processes to parse the problems with
+    memo: a Memo of the problem xml already counted, reported on to stderr at the end
+    store: a CourseStore of the courses already counted, so only those changed since
+           are counted, their errors being reported a course at a time
+    '''
+    courses = defaultdict(lambda: defaultdict(int))
+    errors = []
+
+    if store is None:
+        count_courses(db, courses, errors, aggregate=aggregate, workers=workers, memo=memo)
+    else:
+        markers = course_markers(db)
+        changed = store.changed(markers)
+        if changed:
+            query = course_query(changed) if len(changed) < len(markers) else None
+            count_courses(db, courses, errors, query, aggregate, workers, memo)
+        store.update(markers, changed, courses, errors)
+        courses, errors = store.load()
+
+    for course_id, error in errors:
+        sys.stderr.write(error)
 
     totals = defaultdict(int)
     rows = []
@@ -64,6 +187,11 @@ def find_problems(db):
         row[problem_type] = count
     writer.writerow(row)
 
+    if store is not None:
+        sys.stderr.write('store: counted {} of {} courses again\n'.format(len(changed), len(markers)))
+    if memo is not None:
+        sys.stderr.write(memo.report())
+
 
 if __name__ == '__main__':
     import argparse
@@ -75,6 +203,12 @@ if __name__ == '__main__':
     parser.add_argument('-u', '--user', help='mongo username', default=None)
     parser.add_argument('-p', '--port', help='mongo port', default=27017, type=int)
     parser.add_argument('-d', '--db', help='mongo db', default='edxapp')
+    parser.add_argument('-a', '--aggregate', action='store_true',
+                        help='count modules other than problems in mongo, only fetching the problems')
+    parser.add_argument('-w', '--workers', help='number of processes to parse problems with', default=1, type=int)
+    parser.add_argument('-m', '--memo', help='SQLite file remembering the problem xml already counted', default=None)
+    parser.add_argument('-s', '--store', help='SQLite file keeping the counts of each course, so only changed '
+                        'courses are counted again', default=None)
 
     args = parser.parse_args(sys.argv[1:])
 
@@ -86,4 +220,13 @@ if __name__ == '__main__':
     else:
         host = args.host
     conn = MongoClient(host, args.port)
-    find_problems(getattr(conn, args.db))
+    memo = Memo(args.memo) if args.memo else None
+    store = CourseStore(args.store) if args.store else None
+    try:
+        find_problems(getattr(conn, args.db), aggregate=args.aggregate, workers=args.workers, memo=memo,
+                      store=store)
+    finally:
+        if memo is not None:
+            memo.close()
+        if store is not None:
+            store.close()
@@ -0,0 +1,366 @@
+"""
+ counting the input types in capa problems, for xblock-stats. Kept apart from the
+ script so that worker processes can import it.
+
+ Input tags are counted without building a tree of the problem, the errors being those
+ ElementTree would give. Most problems are plain xml, with no doctype, comments, CDATA,
+ processing instructions or namespaces, where every < not followed by / starts a tag.
+ So once expat has checked they are well formed their tags are read with a regular
+ expression, and the rest are counted as expat comes to their tags.
+
+ The same problem xml is copied into every rerun of a course, so what is counted can be
+ remembered by the sha1 of the xml in a Memo, kept from one run to the next. And only a
+ few courses change from one day to the next, so what is counted in each course can be
+ kept in a CourseStore, and only the courses changed since counted again.
+
+
+"""
+
+try:
+    from xml.etree.cElementTree import fromstring, ParseError
+except ImportError:
+    # cElementTree is gone from Python 3.9, where ElementTree is just as fast
+    from xml.etree.ElementTree import fromstring, ParseError
+from xml.parsers import expat
+from collections import Counter, defaultdict
+import functools
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+
+# markup that can hide tags from START_TAG or rename them
+NOT_PLAIN = ('<!', '<?', 'xmlns')
+
+# the names of the start tags in plain xml
+START_TAG = re.compile(r'<([^\s/>]+)')
+
+# memo entries kept in memory before being written to its database
+MEMO_BATCH = 10000
+
+
+def is_input(tag):
+    return tag.endswith(('input', 'group')) or tag in ('textline', 'textbox', 'filesubmission', 'schematic', 'crystallography')
+
+
+def problem_data(p):
+    '''
+    Return the xml of a problem document, or None if it hasn't any
+    '''
+    data = p['definition']['data']
+    if not isinstance(data, str):
+        if 'data' not in data:
+            return None
+        data = data['data']
+    return data
+
+
+def count_inputs(data):
+    '''
+    Return {'capa.<tag>': count} of the input tags in the xml of a problem, raising
+    ParseError if it can't be parsed
+    '''
+    if not (NOT_PLAIN[0] in data or NOT_PLAIN[1] in data or NOT_PLAIN[2] in data):
+        _parse(expat.ParserCreate(namespace_separator='}'), data)
+        counts = defaultdict(int)
+        for tag, count in Counter(START_TAG.findall(data)).items():
+            key = _plain_key(tag)
+            if key is None:
+                break
+            if key:
+                counts[key] = count
+        else:
+            return counts
+
+    counts = defaultdict(int)
+
+    def start(tag, attributes):
+        # expat names namespaced tags uri}tag where ElementTree has {uri}tag
+        if '}' in tag:
+            tag = '{' + tag
+        if is_input(tag):
+            counts['capa.' + tag] += 1
+
+    def undefined(entity):
+        raise ParseError('undefined entity &%s;: line %d, column %d' % (
+            entity, parser.CurrentLineNumber, parser.CurrentColumnNumber))
+
+    def skipped(entity, is_parameter_entity):
+        # entities an external DTD might define are skipped by expat, but are errors to ElementTree
+        if not is_parameter_entity:
+            undefined(entity)
+
+    # as are external entities, the one referred to being the external one of the
+    # entities named in the context, which are in no particular order
+    externals = set()
+
+    def declared(entity, is_parameter_entity, value, base, system_id, public_id, notation):
+        if system_id is not None and not is_parameter_entity:
+            externals.add(entity)
+
+    def external(context, base, system_id, public_id):
+        undefined(next(name for name in context.split('\x0c') if name in externals))
+
+    parser = expat.ParserCreate(namespace_separator='}')
+    parser.StartElementHandler = start
+    parser.SkippedEntityHandler = skipped
+    parser.EntityDeclHandler = declared
+    parser.ExternalEntityRefHandler = external
+    _parse(parser, data)
+    return counts
+
+
+@functools.lru_cache(maxsize=4096)
+def _plain_key(tag):
+    # the key a tag read by START_TAG is counted under, '' if it isn't an input, or None
+    # if it has a prefix, which needs no declaration if it's xml: and is named otherwise by expat
+    if ':' in tag:
+        return None
+    return 'capa.' + tag if is_input(tag) else ''
+
+
+def _parse(parser, data):
+
+    try:
+        parser.Parse(data.encode('utf8'), True)
+    except expat.ExpatError as e:
+        raise ParseError(str(e))
+
+
+def count_inputs_tree(data):
+    '''
+    count_inputs by parsing the problem into an ElementTree, as it once was, kept to
+    check and benchmark count_inputs against
+    '''
+    counts = defaultdict(int)
+    tree = fromstring(data.encode('utf8'))
+    for elt in tree.iter():
+        if is_input(elt.tag):
+            counts['capa.' + elt.tag] += 1
+    return counts
+
+
+def parse_counts(data):
+    '''
+    Return (counts, None) of the input tags in the xml of a problem, or (None, message)
+    if it can't be parsed, and the seconds it took
+    '''
+    started = time.time()
+    try:
+        counts, error = count_inputs(data), None
+    except ParseError as e:
+        counts, error = None, str(e)
+    return counts, error, time.time() - started
+
+
+def add_counts(p, courses, counts, error):
+    '''
+    Add the counts of a problem into courses, returning the error message if it
+    couldn't be parsed
+    '''
+    if error is not None:
+        return 'ERROR: cannot parse "{}": {}\n'.format(str(p), error)
+
+    if counts:
+        course = courses['{org}/{course}'.format(**p['_id'])]
+        for key, count in counts.items():
+            course[key] += count
+    return None
+
+
+def count_problem(p, courses, memo=None):
+    '''
+    Count the input types in a problem into courses, returning the error message if
+    it can't be parsed
+
+    memo: a Memo to look the problem up in first, and remember it in
+    '''
+    data = problem_data(p)
+    if data is None:
+        return None
+
+    found = None
+    if memo is not None:
+        key = memo.key(data)
+        found = memo.get(key)
+
+    if found is None:
+        counts, error, seconds = parse_counts(data)
+        if memo is not None:
+            memo.put(key, counts, error, seconds)
+    else:
+        counts, error = found
+
+    return add_counts(p, courses, counts, error)
+
+
+def count_chunk(problems):
+    '''
+    Count the input types in a list of (problem document, memo key, found) in a worker
+    process, found being what a Memo had for the problem or None, and key None if there
+    is no Memo. Returns ({course_id: {'capa.<tag>': count}}, [(course_id, error message), ...],
+    [(key, counts, error, seconds) of the problems parsed for the Memo, ...])
+    '''
+    courses = defaultdict(lambda: defaultdict(int))
+    errors = []
+    parsed = []
+    for p, key, found in problems:
+        data = problem_data(p)
+        if data is None:
+            continue
+
+        if found is None:
+            counts, error, seconds = parse_counts(data)
+            if key is not None:
+                parsed.append((key, counts, error, seconds))
+        else:
+            counts, error = found
+
+        error = add_counts(p, courses, counts, error)
+        if error:
+            errors.append(('{org}/{course}'.format(**p['_id']), error))
+    return dict((course_id, dict(counts)) for course_id, counts in courses.items()), errors, parsed
+
+
+class Memo():
+    '''
+    Remembers the input counts, or parse error, of problem xml by its sha1 in a SQLite
+    database, along with the seconds it took to parse, so that xml seen before needn't
+    be parsed again. Can be used from more than one thread, as with a process pool
+    taking problems from a generator.
+    '''
+
+    def __init__(self, path):
+        '''
+        Constructor
+
+        path: the database, created if it doesn't exist
+        '''
+        self.database = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.database.execute('CREATE TABLE IF NOT EXISTS problems (hash TEXT PRIMARY KEY, counts TEXT, '
+                              'error TEXT, seconds REAL)')
+        self.pending = {}
+        self.hits = 0
+        self.misses = 0
+        self.saved = 0.0
+
+    def key(self, data):
+        return hashlib.sha1(data.encode('utf8')).hexdigest()
+
+    def get(self, key):
+        '''
+        Return (counts, error) remembered for the xml with key, or None if it isn't
+        '''
+        with self.lock:
+            found = self.pending.get(key)
+            if found is None:
+                row = self.database.execute('SELECT counts, error, seconds FROM problems WHERE hash = ?',
+                                            (key,)).fetchone()
+                if row is not None:
+                    found = (json.loads(row[0]) if row[0] is not None else None, row[1], row[2])
+
+            if found is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self.saved += found[2]
+            return found[:2]
+
+    def put(self, key, counts, error, seconds):
+        '''
+        Remember the counts or error of the xml with key, parsed in seconds
+        '''
+        with self.lock:
+            self.pending[key] = (counts, error, seconds)
+            if len(self.pending) >= MEMO_BATCH:
+                self._flush()
+
+    def _flush(self):
+
+        self.database.executemany('INSERT OR REPLACE INTO problems (hash, counts, error, seconds) '
+                                  'VALUES (?, ?, ?, ?)',
+                                  [(key, json.dumps(counts) if counts is not None else None, error, seconds)
+                                   for key, (counts, error, seconds) in self.pending.items()])
+        self.database.commit()
+        self.pending.clear()
+
+    def report(self):
+        '''
+        Return a line on how many problems were found in the memo and the parsing saved
+        '''
+        looked_up = self.hits + self.misses
+        return 'memo: {} of {} problems found ({:.1f}%), saving {:.1f}s of parsing\n'.format(
+            self.hits, looked_up, 100.0 * self.hits / looked_up if looked_up else 0.0, self.saved)
+
+    def close(self):
+
+        with self.lock:
+            self._flush()
+        self.database.close()
+
+
+class CourseStore():
+    '''
+    Keeps the counts and problem errors of each course in a SQLite database, along with
+    a marker that changes when the course does, so that only the courses changed since
+    need counting again
+    '''
+
+    def __init__(self, path):
+        '''
+        Constructor
+
+        path: the database, created if it doesn't exist
+        '''
+        self.database = sqlite3.connect(path)
+        self.database.execute('CREATE TABLE IF NOT EXISTS courses (course_id TEXT PRIMARY KEY, marker TEXT, '
+                              'counts TEXT, errors TEXT)')
+
+    def changed(self, markers):
+        '''
+        Return the ids of the courses in markers, {course_id: marker}, that aren't stored
+        or were stored with another marker, in course order
+        '''
+        stored = dict(self.database.execute('SELECT course_id, marker FROM courses'))
+        return sorted(course_id for course_id, marker in markers.items() if stored.get(course_id) != marker)
+
+    def update(self, markers, changed, courses, errors):
+        '''
+        Store the counts in courses and (course_id, message) errors of the changed courses
+        with their markers, and forget the courses no longer in markers
+        '''
+        course_errors = defaultdict(list)
+        for course_id, error in errors:
+            course_errors[course_id].append(error)
+
+        with self.database:
+            self.database.executemany('INSERT OR REPLACE INTO courses (course_id, marker, counts, errors) '
+                                      'VALUES (?, ?, ?, ?)',
+                                      [(course_id, markers[course_id], json.dumps(courses.get(course_id, {})),
+                                        json.dumps(course_errors[course_id])) for course_id in changed])
+            gone = [(course_id,) for course_id, in self.database.execute('SELECT course_id FROM courses')
+                    if course_id not in markers]
+            self.database.executemany('DELETE FROM courses WHERE course_id = ?', gone)
+
+    def load(self):
+        '''
+        Return ({course_id: {key: count}}, [(course_id, error message), ...]) of the stored
+        courses with anything counted or errors, in course order
+        '''
+        courses = {}
+        errors = []
+        for course_id, counts, course_errors in self.database.execute(
+                'SELECT course_id, counts, errors FROM courses ORDER BY course_id'):
+            counts = json.loads(counts)
+            if counts:
+                courses[course_id] = counts
+            errors.extend((course_id, error) for error in json.loads(course_errors))
+        return courses, errors
+
+    def close(self):
+
+        self.database.close()